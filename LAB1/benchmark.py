@@ -0,0 +1,155 @@
+"""Замер скорости отрисовки фона LAB1 без экрана (платформа offscreen).
+
+Для каждого изображения из imagesToLoad/ окно проходит серию изменений
+размера, как при перетаскивании мышью, затем несколько перерисовок без
+изменения размера. Результат пишется в JSON, который можно сравнить с
+предыдущим запуском:
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from time import perf_counter
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QT_VERSION_STR
+from PyQt5.QtWidgets import QApplication
+from main import MainWindow
+from gallery import list_images
+from paint_stats import PaintStats
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'imagesToLoad')
+
+
+def resize_sequence(steps):
+    """Размеры окна при «перетаскивании» угла туда и обратно"""
+    sizes = []
+    for step in range(steps):
+        t = step / max(1, steps - 1)
+        sizes.append((int(640 + 640 * t), int(400 + 400 * t)))
+    return sizes + sizes[::-1]
+
+
+def measure(app, window, sizes, steady_repaints):
+    window.paint_stats.reset()
+    for width, height in sizes:
+        window.resize(width, height)
+        app.processEvents()
+        window.central_widget.repaint()
+    resize_summary = window.paint_stats.summary()
+
+    # Окно «отпустили»: один качественный кадр и перерисовки без изменений
+    window.paint_stats.reset()
+    window.resize_timer.stop()
+    window.finish_interactive_resize()
+    for _ in range(steady_repaints):
+        window.central_widget.repaint()
+    steady_summary = window.paint_stats.summary()
+
+    for summary in (resize_summary, steady_summary):
+        summary.pop('fps')
+
+    # Полная перерисовка окна вместе с надписью и кнопками
+    window_times = []
+    for _ in range(steady_repaints):
+        started = perf_counter()
+        window.repaint()
+        window_times.append(perf_counter() - started)
+    window_summary = {
+        'avg_ms': PaintStats.average(window_times) * 1000,
+        'p99_ms': PaintStats.percentile(window_times, 0.99) * 1000,
+    }
+    return {'resize': resize_summary, 'steady': steady_summary, 'window': window_summary}
+
+
+def cache_delta(before, after):
+    """Попадания и промахи кэша между двумя снимками stats()"""
+    hits = after['hits'] - before['hits']
+    misses = after['misses'] - before['misses']
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+def run(args):
+    app = QApplication(sys.argv[:1])
+    window = MainWindow(native_decoration=args.native)
+    if not args.disk_cache:
+        window.disk_cache = None
+    window.show()
+    app.processEvents()
+
+    report = {
+        'python': platform.python_version(),
+        'qt': QT_VERSION_STR,
+        'platform': os.environ['QT_QPA_PLATFORM'],
+        'steps': args.steps,
+        'native_decoration': args.native,
+        'results': {},
+    }
+
+    sizes = resize_sequence(args.steps)
+    report['results']['<gradient>'] = measure(app, window, sizes, args.repaints)
+
+    for path in list_images(args.images):
+        # Счётчики кэша общие для всех изображений: берём разницу снимков
+        cache_before = window.pixmap_cache.stats()
+        # Задача выполняется прямо в этом потоке, сигналы доходят синхронно
+        window.begin_image_load(path).run()
+        app.processEvents()
+        result = measure(app, window, sizes, args.repaints)
+        result['cache'] = cache_delta(cache_before, window.pixmap_cache.stats())
+        if window.background_tiles:
+            # Большое изображение рисуется тайлами, у них свой кэш
+            result['tiles'] = window.background_tiles.stats()
+        report['results'][os.path.basename(path)] = result
+
+    window.close()
+    return report
+
+
+def compare(report, baseline):
+    print(f"{'сценарий':<32}{'было, мс':>12}{'стало, мс':>12}{'изменение':>12}")
+    for name, result in report['results'].items():
+        old_result = baseline.get('results', {}).get(name)
+        if not old_result:
+            continue
+        for phase in ('resize', 'steady', 'window'):
+            for metric in ('avg_ms', 'p99_ms'):
+                old = old_result[phase][metric]
+                new = result[phase][metric]
+                change = f"{(new - old) / old * 100:+.0f}%" if old else '-'
+                label = f"{name} {phase} {metric}"
+                print(f"{label:<32}{old:>12.2f}{new:>12.2f}{change:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', default=IMAGES_DIR, help='папка с изображениями')
+    parser.add_argument('--steps', type=int, default=30, help='шагов изменения размера в одну сторону')
+    parser.add_argument('--repaints', type=int, default=50, help='перерисовок без изменения размера')
+    parser.add_argument('--disk-cache', action='store_true', help='использовать дисковый кэш вариантов')
+    parser.add_argument('--native', action='store_true', help='оформление без таблиц стилей')
+    parser.add_argument('--output', default='benchmark.json', help='куда записать отчёт')
+    parser.add_argument('--compare', help='отчёт предыдущего запуска для сравнения')
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
+    print(f"Отчёт записан в {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            compare(report, json.load(baseline_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import QColor, QFont, QPainter, QPalette, QPen, QPixmap
+from PyQt5.QtWidgets import QLabel, QPushButton
+
+
+class RoundedRectCache:
+    """Заранее отрисованные скруглённые прямоугольники.
+
+    Заменяют фон из таблицы стилей: вместо разбора стиля и рисования рамки
+    при каждой отрисовке виджет выводит готовый QPixmap нужного размера.
+    """
+
+    def __init__(self):
+        self.pixmaps = {}
+
+    def get(self, width, height, fill, border, border_width, radius):
+        key = (width, height, fill.rgba(), border.rgba() if border else None, border_width, radius)
+        pixmap = self.pixmaps.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(width, height)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            if border:
+                painter.setPen(QPen(border, border_width))
+            else:
+                painter.setPen(Qt.NoPen)
+            painter.setBrush(fill)
+            inset = border_width / 2
+            painter.drawRoundedRect(
+                QRectF(inset, inset, width - border_width, height - border_width),
+                radius, radius
+            )
+            painter.end()
+            # Старые размеры больше не нужны: окно редко возвращается к ним
+            if len(self.pixmaps) > 32:
+                self.pixmaps.clear()
+            self.pixmaps[key] = pixmap
+        return pixmap
+
+
+rounded_rects = RoundedRectCache()
+
+
+class DecoratedLabel(QLabel):
+    """QLabel с тем же оформлением, что и в таблице стилей LAB1, но без неё"""
+
+    def __init__(self, text, parent=None):
+        super().__init__(text, parent)
+        font = QFont(self.font())
+        font.setPixelSize(24)
+        font.setBold(True)
+        self.setFont(font)
+        palette = self.palette()
+        palette.setColor(QPalette.WindowText, QColor('#f0f0f0'))
+        self.setPalette(palette)
+        self.setMargin(17)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, rounded_rects.get(
+            self.width(), self.height(),
+            QColor(60, 60, 60, 204), QColor('#808080'), 2, 10
+        ))
+        painter.end()
+        super().paintEvent(event)
+
+
+class DecoratedButton(QPushButton):
+    """QPushButton с оформлением кнопок LAB1, нарисованным без таблицы стилей"""
+
+    COLORS = {
+        'normal': QColor('#606060'),
+        'hover': QColor('#707070'),
+        'pressed': QColor('#505050'),
+    }
+
+    def __init__(self, text, parent=None):
+        super().__init__(text, parent)
+        font = QFont(self.font())
+        font.setPixelSize(14)
+        font.setBold(True)
+        self.setFont(font)
+        self.setMinimumSize(190, 64)
+        self.setAttribute(Qt.WA_Hover)
+
+    def paintEvent(self, event):
+        if self.isDown():
+            state = 'pressed'
+        elif self.underMouse():
+            state = 'hover'
+        else:
+            state = 'normal'
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, rounded_rects.get(
+            self.width(), self.height(), self.COLORS[state], None, 0, 8
+        ))
+        painter.setPen(Qt.white)
+        painter.setFont(self.font())
+        painter.drawText(self.rect(), Qt.AlignCenter, self.text())
+        painter.end()
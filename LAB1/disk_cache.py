@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+from PyQt5.QtCore import QSize, QStandardPaths, Qt
+from PyQt5.QtGui import QImage
+
+# Заголовок файла варианта: сигнатура, ширина, высота, длина строки в байтах
+HEADER = struct.Struct('<4s3I')
+MAGIC = b'L1VC'
+VARIANT_FORMAT = QImage.Format_ARGB32_Premultiplied
+
+
+def default_cache_dir():
+    return os.path.join(
+        QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation),
+        'ssau-gui-lab1'
+    )
+
+
+def variant_side(image_size, box_size):
+    """Сторона (степень двойки) варианта, которого хватит для box_size.
+
+    Возвращает None, если вариант не нужен: оригинал и так не больше.
+    """
+    needed = image_size.scaled(box_size, Qt.KeepAspectRatioByExpanding)
+    longest = max(needed.width(), needed.height())
+    side = 1
+    while side < longest:
+        side *= 2
+    if side >= max(image_size.width(), image_size.height()):
+        return None
+    return side
+
+
+def read_hash_index(path):
+    """Индекс хэшей {путь: [размер, время изменения, хэш]}; повреждённый или
+    отсутствующий файл - пустой индекс"""
+    try:
+        with open(path, encoding='utf-8') as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(index, dict):
+        return {}
+    return {
+        file_path: known for file_path, known in index.items()
+        if isinstance(known, list) and len(known) == 3 and isinstance(known[2], str)
+    }
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class VariantDiskCache:
+    """Кэш уменьшенных копий изображений на диске.
+
+    Ключ - хэш содержимого файла и сторона варианта (степень двойки), поэтому
+    переименование или копирование файла не сбрасывает кэш. Варианты хранятся
+    несжатыми пикселями QImage: чтение такого файла - это одно read() без
+    декодирования. Общий объём ограничен max_bytes, при превышении удаляются
+    файлы, которые дольше всего не читались.
+
+    Методы вызываются из рабочих потоков, поэтому общее состояние под замком.
+    Кэш необязательный: ошибки диска (нет места, папка только для чтения,
+    файл удалён во время загрузки) не выходят наружу - вариант просто не
+    находится или не записывается, и изображение декодируется как обычно.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            pass
+
+        # Хэши уже виденных файлов, чтобы не читать их целиком при каждом
+        # открытии; записи удаляются вместе с последним вариантом файла
+        self.hash_index_path = os.path.join(directory, 'hashes.json')
+        self.hash_index = read_hash_index(self.hash_index_path)
+        self.hash_index_changed = False
+
+    def file_hash(self, path):
+        """Хэш содержимого файла или None, если файл не прочитать"""
+        try:
+            stat = os.stat(path)
+            signature = [stat.st_size, stat.st_mtime_ns]
+            with self.lock:
+                known = self.hash_index.get(path)
+            if known and known[:2] == signature:
+                return known[2]
+
+            digest = hashlib.blake2b(digest_size=16)
+            with open(path, 'rb') as image_file:
+                for chunk in iter(lambda: image_file.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        file_hash = digest.hexdigest()
+
+        with self.lock:
+            self.hash_index[path] = signature + [file_hash]
+            self.hash_index_changed = True
+        return file_hash
+
+    def save_hash_index(self):
+        """Записать индекс хэшей, если он менялся; вызывается под замком"""
+        if not self.hash_index_changed:
+            return
+        temp_path = self.hash_index_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as index_file:
+                json.dump(self.hash_index, index_file)
+            os.replace(temp_path, self.hash_index_path)
+        except OSError:
+            remove_quietly(temp_path)
+            return
+        self.hash_index_changed = False
+
+    def variant_path(self, file_hash, side):
+        return os.path.join(self.directory, f'{file_hash}_{side}.raw')
+
+    def load(self, path, image_size, box_size):
+        """Найти вариант, которого хватит для box_size.
+
+        Возвращает QImage или None, если подходящего варианта нет.
+        """
+        side = variant_side(image_size, box_size)
+        if side is None:
+            return None
+
+        file_hash = self.file_hash(path)
+        longest = max(image_size.width(), image_size.height())
+        while file_hash is not None and side < longest:
+            image = self.read_variant(self.variant_path(file_hash, side))
+            if image is not None:
+                with self.lock:
+                    self.hits += 1
+                return image
+            side *= 2
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def read_variant(self, variant_path):
+        try:
+            with open(variant_path, 'rb') as variant_file:
+                data = variant_file.read()
+        except OSError:
+            return None
+
+        if len(data) < HEADER.size:
+            return None
+        magic, width, height, bytes_per_line = HEADER.unpack_from(data)
+        if magic != MAGIC or len(data) != HEADER.size + bytes_per_line * height:
+            return None
+
+        # Отмечаем использование для вытеснения по давности
+        try:
+            os.utime(variant_path)
+        except OSError:
+            pass
+        return QImage(
+            data[HEADER.size:], width, height, bytes_per_line, VARIANT_FORMAT
+        ).copy()
+
+    def store(self, path, image, box_size):
+        """Сохранить вариант изображения image для box_size, если он нужен"""
+        side = variant_side(image.size(), box_size)
+        if side is None:
+            return
+
+        file_hash = self.file_hash(path)
+        if file_hash is None or os.path.exists(self.variant_path(file_hash, side)):
+            return
+
+        variant = image.scaled(QSize(side, side), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.write_variant(file_hash, side, variant)
+
+    def store_variant(self, path, side, variant):
+        """Сохранить уже уменьшенный до стороны side вариант файла path"""
+        file_hash = self.file_hash(path)
+        if file_hash is not None:
+            self.write_variant(file_hash, side, variant)
+
+    def write_variant(self, file_hash, side, variant):
+        """Записать уже уменьшенный до стороны side вариант"""
+        variant_path = self.variant_path(file_hash, side)
+        variant = variant.convertToFormat(VARIANT_FORMAT)
+        header = HEADER.pack(MAGIC, variant.width(), variant.height(), variant.bytesPerLine())
+        pixels = variant.constBits().asstring(variant.sizeInBytes())
+
+        temp_path = f'{variant_path}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_path, 'wb') as variant_file:
+                variant_file.write(header)
+                variant_file.write(pixels)
+            os.replace(temp_path, variant_path)
+        except OSError:
+            # Не записался - значит, в следующий раз декодируется заново
+            remove_quietly(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Удалить давно не читавшиеся варианты сверх max_bytes и записи
+        индекса хэшей, все варианты которых удалены"""
+        with self.lock:
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            entries = []
+            for name in names:
+                if not name.endswith('.raw'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            removed, kept = set(), set()
+            for _, size, name in sorted(entries):
+                file_hash = name.partition('_')[0]
+                if total > self.max_bytes:
+                    remove_quietly(os.path.join(self.directory, name))
+                    removed.add(file_hash)
+                    total -= size
+                else:
+                    kept.add(file_hash)
+
+            # Хэш, для которого вариант ещё только декодируется, не трогаем
+            removed -= kept
+            for path, known in list(self.hash_index.items()):
+                if known[2] in removed:
+                    del self.hash_index[path]
+                    self.hash_index_changed = True
+            self.save_hash_index()
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses}
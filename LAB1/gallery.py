@@ -0,0 +1,143 @@
+import os
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QRunnable, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+from disk_cache import variant_side
+
+THUMBNAIL_SIZE = QSize(96, 64)
+
+
+def list_images(directory):
+    """Отсортированный список файлов изображений в папке"""
+    extensions = {
+        '.' + bytes(image_format).decode().lower()
+        for image_format in QImageReader.supportedImageFormats()
+    }
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if os.path.splitext(name)[1].lower() in extensions
+        and os.path.isfile(os.path.join(directory, name))
+    ]
+
+
+def read_scaled(file_path, max_size, aspect_mode):
+    """Прочитать изображение, сразу уменьшив его не больше, чем до max_size.
+
+    QImageReader.setScaledSize позволяет некоторым форматам (например, JPEG)
+    декодировать сразу в уменьшенном виде, не держа в памяти оригинал.
+    """
+    reader = QImageReader(file_path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and (size.width() > max_size.width() or size.height() > max_size.height()):
+        reader.setScaledSize(size.scaled(max_size, aspect_mode))
+    return reader.read(), reader.errorString()
+
+
+def read_screen_image(file_path, screen_size, disk_cache):
+    """Прочитать изображение для показа на экране размера screen_size.
+
+    Большие изображения декодируются сразу уменьшенными до варианта со
+    стороной-степенью двойки, и этот вариант кладётся в дисковый кэш.
+    """
+    reader = QImageReader(file_path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    side = variant_side(size, screen_size) if size.isValid() else None
+    if side is None:
+        return reader.read(), reader.errorString()
+
+    if disk_cache is not None:
+        cached = disk_cache.load(file_path, size, screen_size)
+        if cached is not None:
+            return cached, ''
+
+    reader.setScaledSize(size.scaled(QSize(side, side), Qt.KeepAspectRatio))
+    image = reader.read()
+    if not image.isNull() and disk_cache is not None:
+        disk_cache.store_variant(file_path, side, image)
+    return image, reader.errorString()
+
+
+class GallerySignals(QObject):
+    # номер галереи, индекс файла, изображение
+    thumbnail_ready = pyqtSignal(int, int, QImage)
+    image_decoded = pyqtSignal(int, int, QImage)
+    failed = pyqtSignal(int, int, str)
+    # задача не стала декодировать изображение, от которого уже ушли
+    skipped = pyqtSignal(int, int)
+
+
+class ThumbnailIndexTask(QRunnable):
+    """Построение миниатюр для всех файлов папки в фоновом потоке"""
+
+    def __init__(self, gallery_id, paths, is_cancelled, signals):
+        super().__init__()
+        self.gallery_id = gallery_id
+        self.paths = paths
+        self.is_cancelled = is_cancelled
+        self.signals = signals
+
+    def run(self):
+        for index, path in enumerate(self.paths):
+            if self.is_cancelled(self.gallery_id):
+                return
+            thumbnail, _ = read_scaled(path, THUMBNAIL_SIZE, Qt.KeepAspectRatio)
+            if not thumbnail.isNull():
+                self.signals.thumbnail_ready.emit(self.gallery_id, index, thumbnail)
+
+
+class GalleryDecodeTask(QRunnable):
+    """Декодирование одного изображения галереи под размер экрана.
+
+    is_wanted(gallery_id, index) проверяется перед декодированием: пока задача
+    стояла в очереди, пользователь мог уйти далеко от этого изображения.
+    """
+
+    def __init__(self, gallery_id, index, path, screen_size, is_wanted, signals, disk_cache):
+        super().__init__()
+        self.gallery_id = gallery_id
+        self.index = index
+        self.path = path
+        self.screen_size = screen_size
+        self.is_wanted = is_wanted
+        self.signals = signals
+        self.disk_cache = disk_cache
+
+    def run(self):
+        if not self.is_wanted(self.gallery_id, self.index):
+            self.signals.skipped.emit(self.gallery_id, self.index)
+            return
+
+        image, error = read_screen_image(self.path, self.screen_size, self.disk_cache)
+        if image.isNull():
+            self.signals.failed.emit(self.gallery_id, self.index, error)
+            return
+        self.signals.image_decoded.emit(self.gallery_id, self.index, image)
+
+
+class GalleryImageCache:
+    """Небольшой LRU-кэш декодированных изображений галереи"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.images = OrderedDict()
+
+    def get(self, index):
+        image = self.images.get(index)
+        if image is not None:
+            self.images.move_to_end(index)
+        return image
+
+    def put(self, index, image):
+        self.images[index] = image
+        self.images.move_to_end(index)
+        while len(self.images) > self.capacity:
+            self.images.popitem(last=False)
+
+    def __contains__(self, index):
+        return index in self.images
+
+    def clear(self):
+        self.images.clear()
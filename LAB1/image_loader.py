@@ -0,0 +1,110 @@
+from PyQt5.QtCore import QObject, QRunnable, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+from tiled_image import TiledImage, build_mip_levels
+
+
+class ImageLoadSignals(QObject):
+    # номер запроса, изображение, превью под размер окна, размер оригинала
+    loaded = pyqtSignal(int, QImage, QImage, QSize)
+    # номер запроса, TiledImage для очень больших изображений
+    tiled_loaded = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class ImageLoadTask(QRunnable):
+    """Декодирование и первое масштабирование изображения в QThreadPool.
+
+    С QImage можно работать из любого потока, поэтому всё тяжёлое делается
+    здесь, а в GUI-поток через сигнал возвращается готовый результат.
+    Если пока шло декодирование пользователь выбрал другой файл,
+    is_cancelled(request_id) вернёт True и результат будет отброшен.
+
+    Объект signals создаётся и живёт в GUI-потоке: если удалять QObject
+    вместе с задачей в рабочем потоке, PyQt может зависнуть.
+
+    Если изображение уже открывали, вместо декодирования оригинала читается
+    его уменьшенный вариант из disk_cache.
+    """
+
+    def __init__(self, request_id, file_path, screen_size, minimum_size, is_cancelled, signals,
+                 tiled_min_pixels, tile_budget_bytes, disk_cache):
+        super().__init__()
+        self.request_id = request_id
+        self.file_path = file_path
+        self.screen_size = screen_size
+        self.minimum_size = minimum_size
+        self.is_cancelled = is_cancelled
+        self.signals = signals
+        self.tiled_min_pixels = tiled_min_pixels
+        self.tile_budget_bytes = tile_budget_bytes
+        self.disk_cache = disk_cache
+
+    def run(self):
+        reader = QImageReader(self.file_path)
+        reader.setAutoTransform(True)
+
+        image_size = reader.size()
+        if self.disk_cache is not None and image_size.isValid():
+            variant = self.disk_cache.load(self.file_path, image_size, self.screen_size)
+            if variant is not None:
+                # Поворот по EXIF меняет местами стороны оригинала
+                if (variant.width() > variant.height()) != (image_size.width() > image_size.height()):
+                    image_size.transpose()
+                self.emit_loaded(variant, image_size)
+                return
+
+        image = reader.read()
+
+        if self.is_cancelled(self.request_id):
+            return
+
+        if image.isNull():
+            self.signals.failed.emit(self.request_id, reader.errorString())
+            return
+
+        if image.width() * image.height() >= self.tiled_min_pixels:
+            self.emit_tiled(image)
+        else:
+            self.emit_loaded(image, image.size())
+
+        # Запись варианта не задерживает первую отрисовку
+        if self.disk_cache is not None:
+            self.disk_cache.store(self.file_path, image, self.screen_size)
+
+    def emit_loaded(self, image, image_size):
+        preview = image.scaled(
+            expected_window_size(image_size, self.screen_size, self.minimum_size),
+            Qt.KeepAspectRatioByExpanding,
+            Qt.SmoothTransformation
+        )
+
+        if self.is_cancelled(self.request_id):
+            return
+
+        self.signals.loaded.emit(self.request_id, image, preview, image_size)
+
+    def emit_tiled(self, image):
+        # Окно не бывает больше экрана, поэтому масштаб для развёрнутого окна -
+        # максимальный, который когда-либо понадобится
+        image_size = image.size()
+        max_scale = image_size.scaled(
+            self.screen_size, Qt.KeepAspectRatioByExpanding
+        ).width() / image_size.width()
+        first_level, levels = build_mip_levels(image, max_scale)
+
+        if self.is_cancelled(self.request_id):
+            return
+
+        tiled = TiledImage(image_size, first_level, levels, self.tile_budget_bytes)
+        self.signals.tiled_loaded.emit(self.request_id, tiled)
+
+
+def expected_window_size(image_size, screen_size, minimum_size):
+    """Размер окна после загрузки: по изображению или на весь экран.
+
+    screen_size - клиентская область развёрнутого окна, minimum_size -
+    минимальный размер, который допускает компоновка окна.
+    """
+    if image_size.width() > screen_size.width() or image_size.height() > screen_size.height():
+        return screen_size
+    return image_size.expandedTo(minimum_size)
@@ -1,4 +1,6 @@
+import os
 import sys
+from time import perf_counter
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -9,26 +11,62 @@ from PyQt5.QtWidgets import (
     QPushButton,
     QFileDialog,
     QMessageBox,
+    QListWidget,
+    QListWidgetItem,
+    QListView,
+    QShortcut,
+)
+from PyQt5.QtGui import QPixmap, QPainter, QColor, QLinearGradient, QIcon, QKeySequence, QPalette, QFont
+from PyQt5.QtCore import Qt, QSize, QTimer, QThreadPool
+from pixmap_cache import ScaledPixmapCache
+from paint_stats import PaintStats
+from decorated import DecoratedButton, DecoratedLabel
+from image_loader import ImageLoadSignals, ImageLoadTask, expected_window_size
+from disk_cache import VariantDiskCache, default_cache_dir
+from gallery import (
+    THUMBNAIL_SIZE,
+    GalleryDecodeTask,
+    GalleryImageCache,
+    GallerySignals,
+    ThumbnailIndexTask,
+    list_images,
 )
-from PyQt5.QtGui import QPixmap, QPainter, QColor, QLinearGradient
-from PyQt5.QtCore import Qt
 
 TEXT_1 = 'Надпись 1'
 TEXT_2 = 'Подпись 2'
+WINDOW_TITLE = "Приложение на PyQT"
+# Сколько мс размер окна должен не меняться, чтобы перерисовать фон качественно
+RESIZE_SETTLE_MS = 150
+# Изображения больше этого числа пикселей рисуются тайлами с mip-уровней
+TILED_IMAGE_MIN_PIXELS = 4096 * 4096
+# Сколько памяти могут занимать тайлы одного изображения
+TILE_CACHE_BUDGET_MB = 64
+# Сколько соседних изображений галереи декодируется заранее в каждую сторону
+GALLERY_PREFETCH = 1
+GALLERY_CACHE_SIZE = 2 * GALLERY_PREFETCH + 3
+# Предел объёма дискового кэша уменьшенных копий
+DISK_CACHE_MAX_MB = 512
+# Как часто обновляется панель статистики отрисовки
+STATS_OVERLAY_INTERVAL_MS = 250
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, native_decoration=False):
         super().__init__()
-        self.setWindowTitle("Приложение на PyQT")
+        self.setWindowTitle(WINDOW_TITLE)
         self.setGeometry(100, 100, 800, 500)
 
-        self.setStyleSheet("""
-            QMainWindow {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1,
-                    stop: 0 #2b2b2b, stop: 1 #3c3c3c);
-                border-radius: 10px;
-            }
-        """)
+        # native_decoration: надпись и кнопки рисуются сами из заранее
+        # отрисованных QPixmap, без разбора таблиц стилей при каждой отрисовке.
+        # Фон QMainWindow всё равно полностью закрыт центральным виджетом
+        self.native_decoration = native_decoration
+        if not native_decoration:
+            self.setStyleSheet("""
+                QMainWindow {
+                    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1,
+                        stop: 0 #2b2b2b, stop: 1 #3c3c3c);
+                    border-radius: 10px;
+                }
+            """)
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -38,19 +76,22 @@ class MainWindow(QMainWindow):
         main_layout.setSpacing(15)
         self.central_widget.setLayout(main_layout)
 
-        self.label = QLabel(TEXT_1)
+        if native_decoration:
+            self.label = DecoratedLabel(TEXT_1)
+        else:
+            self.label = QLabel(TEXT_1)
+            self.label.setStyleSheet("""
+                QLabel {
+                    font-size: 24px;
+                    font-weight: bold;
+                    color: #f0f0f0;
+                    background-color: rgba(60, 60, 60, 0.8);
+                    padding: 15px;
+                    border-radius: 10px;
+                    border: 2px solid #808080;
+                }
+            """)
         self.label.setAlignment(Qt.AlignCenter)
-        self.label.setStyleSheet("""
-            QLabel {
-                font-size: 24px;
-                font-weight: bold;
-                color: #f0f0f0;
-                background-color: rgba(60, 60, 60, 0.8);
-                padding: 15px;
-                border-radius: 10px;
-                border: 2px solid #808080;
-            }
-        """)
         self.label.setMinimumHeight(80)
         main_layout.addWidget(self.label)
 
@@ -80,40 +121,213 @@ class MainWindow(QMainWindow):
             }
         """
 
-        self.button1 = QPushButton("Сменить текст")
+        self.button1 = self.create_button("Сменить текст", button_style)
         self.button1.clicked.connect(self.change_label_text)
-        self.button1.setStyleSheet(button_style)
         buttons_layout.addWidget(self.button1)
 
-        self.button2 = QPushButton("Загрузить изображение")
+        self.button2 = self.create_button("Загрузить изображение", button_style)
         self.button2.clicked.connect(self.load_transparent_image)
-        self.button2.setStyleSheet(button_style)
         buttons_layout.addWidget(self.button2)
 
+        self.button3 = self.create_button("Открыть папку", button_style)
+        self.button3.clicked.connect(self.open_gallery)
+        buttons_layout.addWidget(self.button3)
+
+        # Лента миниатюр для режима галереи
+        self.thumbnails = QListWidget()
+        self.thumbnails.setViewMode(QListView.IconMode)
+        self.thumbnails.setFlow(QListView.LeftToRight)
+        self.thumbnails.setWrapping(False)
+        self.thumbnails.setMovement(QListView.Static)
+        self.thumbnails.setIconSize(THUMBNAIL_SIZE)
+        self.thumbnails.setGridSize(THUMBNAIL_SIZE + QSize(16, 24))
+        self.thumbnails.setFixedHeight(THUMBNAIL_SIZE.height() + 60)
+        self.thumbnails.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.thumbnails.setStyleSheet("""
+            QListWidget {
+                background-color: rgba(60, 60, 60, 0.8);
+                color: #f0f0f0;
+                border: 2px solid #808080;
+                border-radius: 10px;
+            }
+            QListWidget::item:selected {
+                background-color: #707070;
+            }
+        """)
+        self.thumbnails.currentRowChanged.connect(self.show_gallery_image)
+        self.thumbnails.hide()
+        main_layout.addWidget(self.thumbnails)
+
+        QShortcut(QKeySequence(Qt.Key_Right), self, self.show_next_image)
+        QShortcut(QKeySequence(Qt.Key_Left), self, self.show_previous_image)
+
         self.background_pixmap = None
+        self.background_tiles = None
+        # Градиент по умолчанию, отрисованный под текущий размер окна
+        self.gradient_pixmap = None
+        self.pixmap_cache = ScaledPixmapCache()
+
+        # Пока окно тянут мышью, фон масштабируется быстро (FastTransformation),
+        # а после паузы в RESIZE_SETTLE_MS - один раз качественно
+        self.interactive_resize = False
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_SETTLE_MS)
+        self.resize_timer.timeout.connect(self.finish_interactive_resize)
+
+        # Загрузка изображений идёт в отдельном пуле потоков; номер запроса
+        # позволяет отбросить результат, если пользователь уже выбрал другой файл.
+        # Глобальный пул не подходит: Qt сам использует его для масштабирования
+        # и конвертации QImage, и задача, ждущая GIL, может его заблокировать
+        self.thread_pool = QThreadPool(self)
+        self.load_request_id = 0
+        self.load_started_at = None
+        self.load_signals = ImageLoadSignals(self)
+        self.load_signals.loaded.connect(self.on_image_loaded)
+        self.load_signals.tiled_loaded.connect(self.on_tiled_image_loaded)
+        self.load_signals.failed.connect(self.on_image_failed)
+
+        try:
+            self.disk_cache = VariantDiskCache(default_cache_dir(), DISK_CACHE_MAX_MB * 1024 * 1024)
+        except OSError as e:
+            print(f"Дисковый кэш отключён: {e}")
+            self.disk_cache = None
+
+        # Галерея: миниатюры строятся в своём пуле из одного потока, чтобы
+        # не мешать декодированию показываемых изображений
+        self.index_pool = QThreadPool(self)
+        self.index_pool.setMaxThreadCount(1)
+        self.gallery_id = 0
+        self.gallery_paths = []
+        self.gallery_index = -1
+        self.gallery_pending = set()
+        self.gallery_cache = GalleryImageCache(GALLERY_CACHE_SIZE)
+        self.gallery_signals = GallerySignals(self)
+        self.gallery_signals.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.gallery_signals.image_decoded.connect(self.on_gallery_image_decoded)
+        self.gallery_signals.failed.connect(self.on_gallery_image_failed)
+        self.gallery_signals.skipped.connect(self.on_gallery_image_skipped)
+
+        # Панель статистики отрисовки (F3). Она непрозрачная и обновляется
+        # по таймеру, поэтому сама не вызывает перерисовку фона
+        self.paint_stats = PaintStats()
+        self.stats_overlay = QLabel(self.central_widget)
+        self.stats_overlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.stats_overlay.setAutoFillBackground(True)
+        palette = self.stats_overlay.palette()
+        palette.setColor(QPalette.Window, QColor(32, 32, 32))
+        palette.setColor(QPalette.WindowText, QColor(127, 255, 127))
+        self.stats_overlay.setPalette(palette)
+        self.stats_overlay.setFont(QFont("monospace", 9))
+        self.stats_overlay.setMargin(6)
+        self.stats_overlay.hide()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(STATS_OVERLAY_INTERVAL_MS)
+        self.stats_timer.timeout.connect(self.update_stats_overlay)
+        QShortcut(QKeySequence(Qt.Key_F3), self, self.toggle_stats_overlay)
+
         self.central_widget.setAttribute(Qt.WA_TranslucentBackground)
         self.central_widget.setAutoFillBackground(False)
         self.central_widget.paintEvent = self.paint_background
 
     def paint_background(self, event):
+        started = perf_counter()
+        scale_time = 0.0
         painter = QPainter(self.central_widget)
         painter.setRenderHint(QPainter.Antialiasing)
         
-        if self.background_pixmap:
-            scaled_pixmap = self.background_pixmap.scaled(
+        if self.background_tiles:
+            painter.setOpacity(0.7)
+            if not self.interactive_resize:
+                painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            # Масштаб здесь - выбор уровня и подготовка тайлов, а уменьшение
+            # тайлов до экрана происходит при выводе
+            scale_time = self.background_tiles.draw(painter, self.central_widget.size())
+        elif self.background_pixmap:
+            # Качественная копия нужного размера могла уже прийти из потока загрузки
+            scaled_pixmap = self.pixmap_cache.lookup(
+                self.background_pixmap,
                 self.central_widget.size(),
                 Qt.KeepAspectRatioByExpanding,
                 Qt.SmoothTransformation
             )
+            if scaled_pixmap is None:
+                if self.interactive_resize:
+                    transform_mode = Qt.FastTransformation
+                else:
+                    transform_mode = Qt.SmoothTransformation
+                scaled_pixmap = self.pixmap_cache.get(
+                    self.background_pixmap,
+                    self.central_widget.size(),
+                    Qt.KeepAspectRatioByExpanding,
+                    transform_mode
+                )
+            scale_time = perf_counter() - started
             painter.setOpacity(0.7)
             painter.drawPixmap(0, 0, scaled_pixmap)
         else:
+            painter.drawPixmap(0, 0, self.background_gradient())
+        
+        painter.end()
+
+        total_time = perf_counter() - started
+        self.paint_stats.record(total_time, scale_time, total_time - scale_time)
+
+        if self.has_background() and self.load_started_at is not None:
+            elapsed_ms = (perf_counter() - self.load_started_at) * 1000
+            self.load_started_at = None
+            self.setWindowTitle(f"{WINDOW_TITLE} — первый кадр через {elapsed_ms:.0f} мс")
+
+    def background_gradient(self):
+        size = self.central_widget.size()
+        if self.gradient_pixmap is None or self.gradient_pixmap.size() != size:
+            self.gradient_pixmap = QPixmap(size)
             gradient = QLinearGradient(0, 0, self.width(), self.height())
             gradient.setColorAt(0, QColor(43, 43, 43))
             gradient.setColorAt(1, QColor(60, 60, 60))
-            painter.fillRect(self.central_widget.rect(), gradient)
-        
-        painter.end()
+            painter = QPainter(self.gradient_pixmap)
+            painter.fillRect(self.gradient_pixmap.rect(), gradient)
+            painter.end()
+        return self.gradient_pixmap
+
+    def create_button(self, text, style):
+        if self.native_decoration:
+            return DecoratedButton(text)
+        button = QPushButton(text)
+        button.setStyleSheet(style)
+        return button
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Отмасштабированные копии под старый размер больше не понадобятся
+        self.pixmap_cache.retain_size(self.central_widget.size())
+        if self.has_background():
+            self.interactive_resize = True
+            self.resize_timer.start()
+
+    def toggle_stats_overlay(self):
+        if self.stats_overlay.isVisible():
+            self.stats_timer.stop()
+            self.stats_overlay.hide()
+        else:
+            self.update_stats_overlay()
+            self.stats_overlay.show()
+            self.stats_overlay.raise_()
+            self.stats_timer.start()
+
+    def update_stats_overlay(self):
+        cache = self.pixmap_cache.stats()
+        lines = self.paint_stats.overlay_lines()
+        lines.append(f"Кэш: {cache['hits']} попаданий, {cache['misses']} промахов")
+        self.stats_overlay.setText("\n".join(lines))
+        self.stats_overlay.adjustSize()
+
+    def has_background(self):
+        return self.background_pixmap is not None or self.background_tiles is not None
+
+    def finish_interactive_resize(self):
+        self.interactive_resize = False
+        self.central_widget.update()
 
     def change_label_text(self):
         if self.text_is_changed:
@@ -134,32 +348,223 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
 
-        pixmap = QPixmap(file_path)
-        if pixmap.isNull():
-            QMessageBox.critical(self, "Ошибка", "Не удалось загрузить изображение.")
+        self.thread_pool.start(self.begin_image_load(file_path))
+
+    def begin_image_load(self, file_path):
+        """Подготовить окно к загрузке файла и вернуть задачу для пула потоков"""
+        self.close_gallery()
+        self.load_request_id += 1
+        self.load_started_at = perf_counter()
+        # Ещё не начатые задачи больше не нужны
+        self.thread_pool.clear()
+
+        # Пока изображение декодируется, рисуется фоновый градиент
+        self.background_pixmap = None
+        self.background_tiles = None
+        self.pixmap_cache.invalidate()
+        self.setWindowTitle(f"{WINDOW_TITLE} — загрузка...")
+        self.central_widget.update()
+
+        return ImageLoadTask(
+            self.load_request_id,
+            file_path,
+            self.maximized_client_size(),
+            self.minimumSizeHint(),
+            self.is_load_cancelled,
+            self.load_signals,
+            TILED_IMAGE_MIN_PIXELS,
+            TILE_CACHE_BUDGET_MB * 1024 * 1024,
+            self.disk_cache
+        )
+
+    def maximized_client_size(self):
+        frame = self.frameGeometry().size() - self.geometry().size()
+        return self.screen().availableGeometry().size() - frame
+
+    def is_load_cancelled(self, request_id):
+        return request_id != self.load_request_id
+
+    def on_image_loaded(self, request_id, image, preview, image_size):
+        if self.is_load_cancelled(request_id):
             return
 
+        pixmap = QPixmap.fromImage(image)
         self.background_pixmap = pixmap
+        self.background_tiles = None
+        self.pixmap_cache.invalidate()
 
-        img_width = pixmap.width()
-        img_height = pixmap.height()
+        window_size = self.target_window_size(image_size)
+        self.pixmap_cache.put(
+            pixmap,
+            window_size,
+            Qt.KeepAspectRatioByExpanding,
+            Qt.SmoothTransformation,
+            QPixmap.fromImage(preview)
+        )
+
+        self.fit_window(window_size)
+
+    def on_tiled_image_loaded(self, request_id, tiled):
+        if self.is_load_cancelled(request_id):
+            return
+
+        self.background_pixmap = None
+        self.background_tiles = tiled
+        self.pixmap_cache.invalidate()
+        self.fit_window(self.target_window_size(tiled.size()))
 
-        screen = self.screen().availableGeometry()
-        screen_width = screen.width()
-        screen_height = screen.height()
+    def target_window_size(self, image_size):
+        return expected_window_size(image_size, self.maximized_client_size(), self.minimumSizeHint())
 
-        if img_width > screen_width or img_height > screen_height:
+    def fit_window(self, window_size):
+        if window_size == self.maximized_client_size():
             self.showMaximized()
         else:
-            self.resize(img_width, img_height)
+            self.resize(window_size)
 
         self.central_widget.update()
 
+    def on_image_failed(self, request_id, error):
+        if self.is_load_cancelled(request_id):
+            return
+
+        self.load_started_at = None
+        self.setWindowTitle(WINDOW_TITLE)
+        QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить изображение.\n{error}")
+
+
+    def open_gallery(self):
+        directory = QFileDialog.getExistingDirectory(self, "Выберите папку с изображениями")
+        if not directory:
+            return
+
+        paths = list_images(directory)
+        if not paths:
+            QMessageBox.warning(self, "Предупреждение", "В папке нет изображений.")
+            return
+
+        self.close_gallery()
+        # Отменяем загрузку одиночного изображения, если она ещё идёт
+        self.load_request_id += 1
+        self.load_started_at = None
+        self.thread_pool.clear()
+
+        self.gallery_paths = paths
+        self.thumbnails.setUpdatesEnabled(False)
+        for path in paths:
+            self.thumbnails.addItem(QListWidgetItem(os.path.basename(path)))
+        self.thumbnails.setUpdatesEnabled(True)
+        self.thumbnails.show()
+
+        self.index_pool.start(ThumbnailIndexTask(
+            self.gallery_id, paths, self.is_gallery_cancelled, self.gallery_signals
+        ))
+        self.thumbnails.setCurrentRow(0)
+
+    def close_gallery(self):
+        self.gallery_id += 1
+        self.index_pool.clear()
+        self.gallery_paths = []
+        self.gallery_index = -1
+        self.gallery_pending.clear()
+        self.gallery_cache.clear()
+        self.thumbnails.blockSignals(True)
+        self.thumbnails.clear()
+        self.thumbnails.blockSignals(False)
+        self.thumbnails.hide()
+
+    def is_gallery_cancelled(self, gallery_id):
+        return gallery_id != self.gallery_id
+
+    def is_gallery_image_wanted(self, gallery_id, index):
+        return (
+            not self.is_gallery_cancelled(gallery_id)
+            and abs(index - self.gallery_index) <= GALLERY_PREFETCH
+        )
+
+    def show_next_image(self):
+        if self.gallery_paths:
+            self.thumbnails.setCurrentRow(min(self.gallery_index + 1, len(self.gallery_paths) - 1))
+
+    def show_previous_image(self):
+        if self.gallery_paths:
+            self.thumbnails.setCurrentRow(max(self.gallery_index - 1, 0))
+
+    def show_gallery_image(self, index):
+        if index < 0 or index >= len(self.gallery_paths):
+            return
+
+        self.gallery_index = index
+        self.setWindowTitle(
+            f"{WINDOW_TITLE} — {os.path.basename(self.gallery_paths[index])} "
+            f"({index + 1}/{len(self.gallery_paths)})"
+        )
+
+        image = self.gallery_cache.get(index)
+        if image is not None:
+            self.set_gallery_background(image)
+
+        # Сначала текущее изображение, затем соседи
+        wanted = [index]
+        for offset in range(1, GALLERY_PREFETCH + 1):
+            wanted.extend([index + offset, index - offset])
+        for wanted_index in wanted:
+            if 0 <= wanted_index < len(self.gallery_paths):
+                self.request_gallery_image(wanted_index)
+
+    def request_gallery_image(self, index):
+        if index in self.gallery_cache or index in self.gallery_pending:
+            return
+        self.gallery_pending.add(index)
+        self.thread_pool.start(GalleryDecodeTask(
+            self.gallery_id,
+            index,
+            self.gallery_paths[index],
+            self.maximized_client_size(),
+            self.is_gallery_image_wanted,
+            self.gallery_signals,
+            self.disk_cache
+        ))
+
+    def set_gallery_background(self, image):
+        self.background_pixmap = QPixmap.fromImage(image)
+        self.background_tiles = None
+        self.pixmap_cache.invalidate()
+        self.central_widget.update()
+
+    def on_thumbnail_ready(self, gallery_id, index, thumbnail):
+        if self.is_gallery_cancelled(gallery_id):
+            return
+        self.thumbnails.item(index).setIcon(QIcon(QPixmap.fromImage(thumbnail)))
+
+    def on_gallery_image_decoded(self, gallery_id, index, image):
+        if self.is_gallery_cancelled(gallery_id):
+            return
+        self.gallery_pending.discard(index)
+        self.gallery_cache.put(index, image)
+        if index == self.gallery_index:
+            self.set_gallery_background(image)
+
+    def on_gallery_image_failed(self, gallery_id, index, error):
+        if self.is_gallery_cancelled(gallery_id):
+            return
+        self.gallery_pending.discard(index)
+        print(f"Не удалось загрузить {self.gallery_paths[index]}: {error}")
+
+    def on_gallery_image_skipped(self, gallery_id, index):
+        if self.is_gallery_cancelled(gallery_id):
+            return
+        self.gallery_pending.discard(index)
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
         
-    window = MainWindow()
+    window = MainWindow(native_decoration='--native' in sys.argv)
     window.show()
 
-    sys.exit(app.exec_())
\ No newline at end of file
+    exit_code = app.exec_()
+    print(f"Кэш масштабирования: {window.pixmap_cache.stats()}")
+    if window.disk_cache is not None:
+        print(f"Дисковый кэш: {window.disk_cache.stats()}")
+    sys.exit(exit_code)
\ No newline at end of file
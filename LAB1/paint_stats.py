@@ -0,0 +1,72 @@
+from collections import deque
+from time import perf_counter
+
+
+class PaintStats:
+    """Статистика времени отрисовки фона.
+
+    Хранит длительности последних window отрисовок: общее время, время
+    масштабирования и время вывода (blit) - и моменты отрисовок для расчёта
+    фактического FPS за последнюю секунду.
+    """
+
+    def __init__(self, window=500):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.last = 0.0
+        self.totals = deque(maxlen=self.window)
+        self.scale_times = deque(maxlen=self.window)
+        self.blit_times = deque(maxlen=self.window)
+        self.frame_times = deque()
+
+    def record(self, total, scale, blit):
+        now = perf_counter()
+        self.count += 1
+        self.last = total
+        self.totals.append(total)
+        self.scale_times.append(scale)
+        self.blit_times.append(blit)
+        self.frame_times.append(now)
+        self.drop_old_frames(now)
+
+    def drop_old_frames(self, now):
+        while self.frame_times and now - self.frame_times[0] > 1.0:
+            self.frame_times.popleft()
+
+    @staticmethod
+    def percentile(values, fraction):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    @staticmethod
+    def average(values):
+        return sum(values) / len(values) if values else 0.0
+
+    def summary(self):
+        """Сводка в миллисекундах"""
+        self.drop_old_frames(perf_counter())
+        return {
+            'paints': self.count,
+            'last_ms': self.last * 1000,
+            'avg_ms': self.average(self.totals) * 1000,
+            'p99_ms': self.percentile(self.totals, 0.99) * 1000,
+            'max_ms': max(self.totals, default=0.0) * 1000,
+            'scale_avg_ms': self.average(self.scale_times) * 1000,
+            'blit_avg_ms': self.average(self.blit_times) * 1000,
+            'fps': len(self.frame_times),
+        }
+
+    def overlay_lines(self):
+        summary = self.summary()
+        return [
+            f"Отрисовок: {summary['paints']}",
+            f"Последняя: {summary['last_ms']:.2f} мс",
+            f"Средняя: {summary['avg_ms']:.2f} мс, p99: {summary['p99_ms']:.2f} мс",
+            f"Масштаб: {summary['scale_avg_ms']:.2f} мс, вывод: {summary['blit_avg_ms']:.2f} мс",
+            f"FPS: {summary['fps']}",
+        ]
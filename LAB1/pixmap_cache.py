@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+
+class ScaledPixmapCache:
+    """Кэш отмасштабированных QPixmap.
+
+    Ключ - (исходное изображение, целевой размер, режимы масштабирования),
+    поэтому повторная отрисовка того же кадра сводится к простому drawPixmap.
+    """
+
+    def __init__(self, capacity=4):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(pixmap, size, aspect_mode, transform_mode):
+        return (
+            pixmap.cacheKey(),
+            size.width(),
+            size.height(),
+            int(aspect_mode),
+            int(transform_mode),
+        )
+
+    def lookup(self, pixmap, size, aspect_mode, transform_mode):
+        """Вернуть готовую копию или None, ничего не масштабируя"""
+        key = self.make_key(pixmap, size, aspect_mode, transform_mode)
+        scaled = self.entries.get(key)
+        if scaled is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return scaled
+
+    def get(self, pixmap, size, aspect_mode, transform_mode):
+        scaled = self.lookup(pixmap, size, aspect_mode, transform_mode)
+        if scaled is not None:
+            return scaled
+
+        self.misses += 1
+        scaled = pixmap.scaled(size, aspect_mode, transform_mode)
+        self.put(pixmap, size, aspect_mode, transform_mode, scaled)
+        return scaled
+
+    def put(self, pixmap, size, aspect_mode, transform_mode, scaled):
+        key = self.make_key(pixmap, size, aspect_mode, transform_mode)
+        self.entries[key] = scaled
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def retain_size(self, size):
+        """Сбросить записи для всех размеров, кроме текущего (вызывается при resize)"""
+        for key in list(self.entries):
+            if (key[1], key[2]) != (size.width(), size.height()):
+                del self.entries[key]
+
+    def invalidate(self):
+        """Сбросить весь кэш (вызывается при загрузке нового изображения)"""
+        self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,176 @@
+from collections import OrderedDict
+from time import perf_counter
+from PyQt5.QtCore import QRect, Qt
+from PyQt5.QtGui import QPixmap
+
+TILE_SIZE = 512
+
+
+def level_for_scale(scale):
+    """Самый грубый mip-уровень, которого ещё хватает для масштаба scale"""
+    level = 0
+    while scale <= 0.5 ** (level + 1):
+        level += 1
+    return level
+
+
+def build_mip_levels(image, max_scale, tile_size=TILE_SIZE):
+    """Построить пирамиду уменьшенных вдвое копий изображения.
+
+    Уровни детальнее, чем нужно для масштаба max_scale (окно на весь экран),
+    никогда не рисуются, поэтому не хранятся. Возвращает номер первого
+    сохранённого уровня и список QImage, начиная с него.
+
+    Первый сохранённый уровень меньше удвоенного экрана по стороне, по
+    которой изображение заполняет окно, а вся пирамида - не больше 4/3 его
+    объёма. Если изображение меньше удвоенного экрана по этой стороне
+    (например, длинная панорама), первым уровнем остаётся сам оригинал.
+    """
+    first_level = level_for_scale(max_scale)
+    levels = []
+    current = image
+    level = 0
+    while True:
+        if level >= first_level:
+            levels.append(current)
+        if max(current.width(), current.height()) <= tile_size:
+            break
+        current = current.scaled(
+            max(1, current.width() // 2),
+            max(1, current.height() // 2),
+            Qt.IgnoreAspectRatio,
+            Qt.SmoothTransformation
+        )
+        level += 1
+
+    if not levels:
+        levels.append(current)
+        first_level = level
+    return first_level, levels
+
+
+class TileCache:
+    """LRU-кэш тайлов QPixmap с ограничением по объёму в байтах"""
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, make_tile):
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+        self.misses += 1
+        tile = make_tile()
+        self.tiles[key] = tile
+        self.used_bytes += self.tile_bytes(tile)
+        # Последний добавленный тайл не вытесняется, даже если бюджет меньше тайла
+        while self.used_bytes > self.budget_bytes and len(self.tiles) > 1:
+            _, evicted = self.tiles.popitem(last=False)
+            self.used_bytes -= self.tile_bytes(evicted)
+            self.evictions += 1
+        return tile
+
+    @staticmethod
+    def tile_bytes(tile):
+        return tile.width() * tile.height() * max(1, tile.depth() // 8)
+
+    def clear(self):
+        self.tiles.clear()
+        self.used_bytes = 0
+
+
+class TiledImage:
+    """Очень большое изображение, которое рисуется тайлами с mip-уровней.
+
+    Пирамида (QImage) строится один раз, в потоке загрузки. QPixmap для тайлов
+    создаются в GUI-потоке по мере надобности и живут в TileCache.
+
+    Бюджет tile_budget_bytes ограничивает только тайлы: пирамида хранится
+    целиком вне его (level_bytes в stats, оценка - в build_mip_levels).
+    Итого в памяти level_bytes + tile_budget_bytes, а во время загрузки ещё
+    и декодированный оригинал, пока строится пирамида и пишется дисковый кэш.
+    """
+
+    def __init__(self, image_size, first_level, levels, tile_budget_bytes, tile_size=TILE_SIZE):
+        self.image_size = image_size
+        self.first_level = first_level
+        self.levels = levels
+        self.tile_size = tile_size
+        self.tile_cache = TileCache(tile_budget_bytes)
+        self.level_bytes = sum(image.sizeInBytes() for image in levels)
+
+    def size(self):
+        return self.image_size
+
+    def draw(self, painter, target_size, aspect_mode=Qt.KeepAspectRatioByExpanding):
+        """Нарисовать изображение, вписанное в target_size, с точки (0, 0).
+
+        Возвращает секунды на подготовку: выбор уровня и создание тайлов,
+        которых не было в кэше. Остальное - вывод тайлов с масштабированием.
+        """
+        started = perf_counter()
+        prepare_time = 0.0
+        scaled_size = self.image_size.scaled(target_size, aspect_mode)
+        scale = scaled_size.width() / self.image_size.width()
+
+        level = min(
+            max(level_for_scale(scale), self.first_level),
+            self.first_level + len(self.levels) - 1
+        )
+        level_image = self.levels[level - self.first_level]
+        # Во сколько раз пиксель уровня больше пикселя экрана
+        level_scale = scaled_size.width() / level_image.width()
+
+        visible_width = min(target_size.width(), scaled_size.width())
+        visible_height = min(target_size.height(), scaled_size.height())
+        last_column = min(
+            int(visible_width / level_scale) // self.tile_size,
+            (level_image.width() - 1) // self.tile_size
+        )
+        last_row = min(
+            int(visible_height / level_scale) // self.tile_size,
+            (level_image.height() - 1) // self.tile_size
+        )
+        prepare_time += perf_counter() - started
+
+        for row in range(last_row + 1):
+            for column in range(last_column + 1):
+                source = QRect(
+                    column * self.tile_size,
+                    row * self.tile_size,
+                    self.tile_size,
+                    self.tile_size
+                ).intersected(level_image.rect())
+                tile_started = perf_counter()
+                tile = self.tile_cache.get(
+                    (level, column, row),
+                    lambda: QPixmap.fromImage(level_image.copy(source))
+                )
+                prepare_time += perf_counter() - tile_started
+                # Границы округляются одинаково у соседних тайлов, чтобы не было щелей
+                left = round(source.left() * level_scale)
+                top = round(source.top() * level_scale)
+                right = round((source.left() + source.width()) * level_scale)
+                bottom = round((source.top() + source.height()) * level_scale)
+                painter.drawPixmap(QRect(left, top, right - left, bottom - top), tile)
+        return prepare_time
+
+    def stats(self):
+        return {
+            'levels': len(self.levels),
+            'first_level': self.first_level,
+            'level_bytes': self.level_bytes,
+            'tiles': len(self.tile_cache.tiles),
+            'tile_bytes': self.tile_cache.used_bytes,
+            'hits': self.tile_cache.hits,
+            'misses': self.tile_cache.misses,
+            'evictions': self.tile_cache.evictions,
+        }
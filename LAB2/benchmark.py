@@ -0,0 +1,195 @@
+"""Замер скорости пересчёта LAB2 без экрана (платформа offscreen).
+
+Меряется отдельно движок (пересчётов в секунду и стоимость форматирования
+суммы в режимах float и Decimal) и окно целиком: время от нажатия клавиши
+в поле USD до перерисовки последнего из остальных полей. Курсы берутся
+синтетические, сеть не используется. Результат пишется в JSON, который
+можно сравнить с предыдущим запуском:
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from time import perf_counter
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEvent, QObject, QT_VERSION_STR, Qt
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+from currency_engine import CurrencyEngine
+
+
+def synthetic_rates(count):
+    """Курсы USD, RUB, EUR и ещё count - 3 выдуманных валют"""
+    rng = random.Random(1)
+    rates = {'USD': 1.0, 'RUB': 92.5, 'EUR': 0.9183}
+    for i in range(count - len(rates)):
+        rates[f'X{i:02X}'] = round(rng.uniform(0.01, 5000), 4)
+    return rates
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure_engine(rates, exact, calls):
+    engine = CurrencyEngine(exact=exact)
+    engine.set_rates(rates)
+    amount = engine.parse('1234.56')
+
+    started = perf_counter()
+    for _ in range(calls):
+        amounts = engine.convert_all('USD', amount)
+    convert_time = perf_counter() - started
+
+    started = perf_counter()
+    for _ in range(max(1, calls // len(rates))):
+        for value in amounts:
+            engine.format_amount(value)
+    format_count = max(1, calls // len(rates)) * len(amounts)
+    format_time = perf_counter() - started
+
+    return {
+        'convert_all_us': convert_time / calls * 1e6,
+        'conversions_per_s': calls * len(rates) / convert_time,
+        'format_us': format_time / format_count * 1e6,
+    }
+
+
+class PaintWatcher(QObject):
+    """Запоминает момент последней отрисовки наблюдаемых виджетов"""
+
+    def __init__(self):
+        super().__init__()
+        self.last_paint = 0.0
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            self.last_paint = perf_counter()
+        return False
+
+
+def measure_window(app, rates, exact, keystrokes):
+    # Окно читает курсы из кэша; свежий кэш - значит, запроса в сеть не будет
+    cache_path = os.path.join(tempfile.mkdtemp(), 'rates_cache.json')
+    with open(cache_path, 'w', encoding='utf-8') as cache_file:
+        json.dump({'base': 'USD', 'rates': rates, 'updated_at': time.time()}, cache_file)
+    os.environ.update({
+        'CURRENCIES': '*',
+        'UPDATE_DELAY_MS': '0',
+        'CONVERSION_MODE': 'decimal' if exact else 'float',
+    })
+
+    from main import CurrencyConverter, RATES_TTL, SignalCurrency
+    from rate_source import RateSource
+    rate_source = RateSource(cache_path, RATES_TTL, os.path.dirname(cache_path), '', '', RATES_TTL)
+    window = CurrencyConverter(SignalCurrency(), rate_source)
+    window.show()
+    app.processEvents()
+
+    watcher = PaintWatcher()
+    for code, field in window.fields.items():
+        if code != 'USD':
+            field.installEventFilter(watcher)
+
+    source = window.fields['USD']
+    source.setFocus()
+    latencies = []
+    for i in range(keystrokes):
+        # Каждая клавиша меняет сумму, поэтому все поля переписываются
+        if i % 6 == 5:
+            source.clear()
+            app.processEvents()
+        watcher.last_paint = 0.0
+        started = perf_counter()
+        QTest.keyClick(source, Qt.Key_1 + i % 9)
+        while not watcher.last_paint and perf_counter() - started < 1.0:
+            app.processEvents()
+        # Дорисовываем оставшиеся поля: им тоже могли прийти события Paint
+        app.processEvents()
+        latencies.append(watcher.last_paint - started)
+
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return {
+        'fields': len(window.fields),
+        'avg_ms': sum(latencies) / len(latencies) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run(args):
+    app = QApplication(sys.argv[:1])
+    report = {
+        'python': platform.python_version(),
+        'qt': QT_VERSION_STR,
+        'platform': os.environ['QT_QPA_PLATFORM'],
+        'results': {},
+    }
+
+    for count in args.currencies:
+        rates = synthetic_rates(count)
+        for exact in (False, True):
+            name = f"{count} {'decimal' if exact else 'float'}"
+            result = {'engine': measure_engine(rates, exact, args.calls)}
+            result['keystroke'] = measure_window(app, rates, exact, args.keystrokes)
+            report['results'][name] = result
+            print(
+                f"{name:<14} convert_all {result['engine']['convert_all_us']:8.1f} мкс, "
+                f"формат {result['engine']['format_us']:6.2f} мкс, "
+                f"клавиша→отрисовка {result['keystroke']['avg_ms']:6.2f} мс"
+            )
+    return report
+
+
+def compare(report, baseline):
+    metrics = (
+        ('engine', 'convert_all_us'),
+        ('engine', 'format_us'),
+        ('keystroke', 'avg_ms'),
+        ('keystroke', 'p99_ms'),
+    )
+    print(f"{'сценарий':<36}{'было':>12}{'стало':>12}{'изменение':>12}")
+    for name, result in report['results'].items():
+        old_result = baseline.get('results', {}).get(name)
+        if not old_result:
+            continue
+        for group, metric in metrics:
+            old = old_result[group][metric]
+            new = result[group][metric]
+            change = f"{(new - old) / old * 100:+.0f}%" if old else '-'
+            label = f"{name} {metric}"
+            print(f"{label:<36}{old:>12.2f}{new:>12.2f}{change:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--currencies', type=int, nargs='+', default=[3, 160], help='сколько валют в полях')
+    parser.add_argument('--calls', type=int, default=20000, help='вызовов convert_all на замер')
+    parser.add_argument('--keystrokes', type=int, default=60, help='нажатий клавиш на замер')
+    parser.add_argument('--output', default='benchmark.json', help='куда записать отчёт')
+    parser.add_argument('--compare', help='отчёт предыдущего запуска для сравнения')
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
+    print(f"Отчёт записан в {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            compare(report, json.load(baseline_file))
+
+
+if __name__ == '__main__':
+    main()
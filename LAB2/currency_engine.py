@@ -0,0 +1,72 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+import numpy as np
+
+# Сколько знаков после точки показывать в полях
+PLACES = 3
+
+
+class CurrencyEngine:
+    """Курсы всех валют относительно базовой в одном векторе NumPy.
+
+    Пересчёт суммы из одной валюты во все остальные - одна векторная
+    операция над массивом курсов, сколько бы валют ни было. В точном
+    режиме (exact=True) суммы и курсы - Decimal, а пересчёт идёт без
+    двоичного округления, но уже поэлементно.
+
+    Движок не зависит от Qt: окно только передаёт ему текст полей и
+    выводит то, что вернул format_amount.
+    """
+
+    def __init__(self, exact=False):
+        self.exact = exact
+        self.quantum = Decimal(1).scaleb(-PLACES)
+        self.codes = []
+        self.index = {}
+        self.rates = np.empty(0)
+        self.exact_rates = []
+
+    def set_rates(self, conversion_rates):
+        self.codes = list(conversion_rates)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.rates = np.fromiter(
+            (conversion_rates[code] for code in self.codes),
+            dtype=np.float64,
+            count=len(self.codes)
+        )
+        if self.exact:
+            # str() даёт курс ровно таким, каким он пришёл в JSON
+            self.exact_rates = [Decimal(str(conversion_rates[code])) for code in self.codes]
+
+    def __bool__(self):
+        return bool(self.codes)
+
+    def __contains__(self, code):
+        return code in self.index
+
+    def parse(self, text):
+        """Сумма из текста поля: Decimal в точном режиме, иначе float"""
+        if self.exact:
+            try:
+                return Decimal(text)
+            except InvalidOperation:
+                raise ValueError(f"не число: {text!r}")
+        return float(text)
+
+    def convert_all(self, code, amount):
+        """Сумма amount в валюте code, выраженная во всех валютах (по порядку codes)"""
+        if self.exact:
+            factor = amount / self.exact_rates[self.index[code]]
+            return [rate * factor for rate in self.exact_rates]
+        return self.rates * (amount / self.rates[self.index[code]])
+
+    def convert(self, code, amount, target):
+        """Сумма amount в валюте code, выраженная в валюте target"""
+        if self.exact:
+            return amount * self.exact_rates[self.index[target]] / self.exact_rates[self.index[code]]
+        return amount * (self.rates[self.index[target]] / self.rates[self.index[code]])
+
+    def format_amount(self, amount):
+        if self.exact:
+            return f"{amount.quantize(self.quantum, rounding=ROUND_HALF_UP):f}"
+        return f"{amount:.{PLACES}f}"
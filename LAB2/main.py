@@ -1,41 +1,64 @@
 import sys
 import os
-import json
+from functools import partial
 from dotenv import load_dotenv
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QLineEdit, QFrame, QGridLayout)
-from PyQt5.QtCore import Qt, QUrl
-from PyQt5.QtGui import QDoubleValidator
-from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
-from singnal_eur import SignalEUR
-from singnal_rub import SignalRUB
-from singnal_usd import SignalUSD
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QLineEdit, QFrame, QGridLayout, QScrollArea, QShortcut)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QDoubleValidator, QKeySequence
+from singnal_currency import SignalCurrency
+from currency_engine import CurrencyEngine
+from update_scheduler import UpdateScheduler
+from rate_history import API_URL, HISTORY_DIR
+from rate_source import RateSource
 
+# Валюты на экране по умолчанию; переменная окружения CURRENCIES задаёт
+# свой список через запятую, а CURRENCIES=* показывает все валюты из API
 currencies = [
     {'code': 'RUB'},
     {'code': 'USD'},
     {'code': 'EUR'},
 ]
 
+# Файл с последними полученными курсами и время их жизни в секундах
+RATES_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rates_cache.json')
+RATES_TTL = 3600
+
+# Как часто обновлять курсы, пока программа открыта, в секундах
+REFRESH_INTERVAL = 600
+
+# Сколько миллисекунд ждать затишья в вводе перед пересчётом
+UPDATE_DELAY_MS = 50
+
+# Точный пересчёт в Decimal (CONVERSION_MODE=decimal) или быстрый во float
+CONVERSION_MODE = 'float'
+
+# Открытые окна; все они получают курсы от одного RateSource
+windows = []
+
 class CurrencyConverter(QMainWindow):
-    def __init__(self, signal_eur, signal_rub, signal_usd):
+    def __init__(self, signal_currency, rate_source):
         super().__init__()
 
-        self.signals = {
-            'EUR': signal_eur,
-            'RUB': signal_rub,
-            'USD': signal_usd,
-        }
+        self.signal_currency = signal_currency
+        self.rate_source = rate_source
         self.updating = False
-        self.api_key = os.getenv('API_KEY')
-        self.network_manager = QNetworkAccessManager()
+        self.fields = {}
+        # Последняя правка пользователя: из неё пересчитываются поля при новых курсах
+        self.last_edit = None
+        self.engine = CurrencyEngine(exact=os.getenv('CONVERSION_MODE', CONVERSION_MODE) == 'decimal')
+        self.scheduler = UpdateScheduler(int(os.getenv('UPDATE_DELAY_MS', UPDATE_DELAY_MS)), self)
+        self.skipped_writes = 0
+        self.show_all = os.getenv('CURRENCIES', '').strip() == '*'
+        if os.getenv('CURRENCIES') and not self.show_all:
+            self.codes = [code.strip().upper() for code in os.getenv('CURRENCIES').split(',') if code.strip()]
+        else:
+            self.codes = [currency['code'] for currency in currencies]
 
-        url = f"https://v6.exchangerate-api.com/v6/{self.api_key}/latest/USD"
-        request = QNetworkRequest(QUrl(url))
-        self.network_manager.get(request)
-        self.network_manager.finished.connect(self.setupRates)
+        self.applyRates(self.rate_source.rates)
 
         self.setWindowTitle("Конвертер валют")
-        self.setFixedSize(400, 330)
+        self.setFixedWidth(400)
+        self.resize(400, 380)
         
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -57,24 +80,48 @@ class CurrencyConverter(QMainWindow):
         
         self.createLayout(main_layout)
 
+        self.stats_label = QLabel()
+        self.stats_label.setAlignment(Qt.AlignCenter)
+        self.stats_label.setStyleSheet("font-size: 12px; color: #7f8c8d;")
+        main_layout.addWidget(self.stats_label)
+        self.updateStats()
+
         self.initSignals()
 
-    def setupRates(self, response):
-        error = response.error()
-        if error == response.NoError:
-            data = json.loads(response.readAll().data())
-            conversion_rates = data.get('conversion_rates', {})
+    def onRatesChanged(self, conversion_rates):
+        self.applyRates(conversion_rates)
+        # Отложенная правка сама пересчитается по новым курсам
+        if self.last_edit and self.scheduler.pending is None:
+            self.updateAll(*self.last_edit)
 
-            self.rates = {
-                'USD': conversion_rates.get('USD', 1),
-                'RUB': conversion_rates.get('RUB', 1),
-                'EUR': conversion_rates.get('EUR', 1),
-            }
+    def openWindow(self):
+        window = CurrencyConverter(SignalCurrency(), self.rate_source)
+        window.move(self.pos() + self.rect().bottomRight() / 8)
+        window.show()
 
-        print(self.rates)
+    def closeEvent(self, event):
+        if self in windows:
+            windows.remove(self)
+        super().closeEvent(event)
+
+    def applyRates(self, conversion_rates):
+        if not conversion_rates:
+            return
+
+        self.engine.set_rates(conversion_rates)
+        if self.show_all and self.codes != self.engine.codes:
+            self.codes = list(self.engine.codes)
+            if self.fields:
+                self.createFields()
 
-        
     def createLayout(self, parent_layout):
+        # Список валют может быть длинным, поэтому он прокручивается
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setFrameShape(QFrame.NoFrame)
+        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        scroll_area.viewport().setAutoFillBackground(False)
+
         container = QFrame()
         container.setStyleSheet("""
             QFrame {
@@ -84,14 +131,25 @@ class CurrencyConverter(QMainWindow):
             }
         """)
         
-        grid_layout = QGridLayout(container)
-        grid_layout.setVerticalSpacing(20)
-        grid_layout.setHorizontalSpacing(15)
-        
+        self.grid_layout = QGridLayout(container)
+        self.grid_layout.setVerticalSpacing(20)
+        self.grid_layout.setHorizontalSpacing(15)
+        self.container = container
+
+        self.createFields()
+
+        scroll_area.setWidget(container)
+        # setWidget включает заливку фона, из-за которой пропадают скруглённые углы
+        container.setAutoFillBackground(False)
+        parent_layout.addWidget(scroll_area)
+
+    def createFields(self):
+        while self.grid_layout.count():
+            self.grid_layout.takeAt(0).widget().deleteLater()
         self.fields = {}
-        
-        for i, currency in enumerate(currencies, 1):
-            text_label = QLabel(f"{currency['code']}")
+
+        for i, code in enumerate(self.codes, 1):
+            text_label = QLabel(code)
             text_label.setStyleSheet("font-size: 14px; color: #2c3e50; padding: 10px")
 
             input_field = QLineEdit()
@@ -112,91 +170,87 @@ class CurrencyConverter(QMainWindow):
                     background-color: #ffffff;
                 }
             """)
+            input_field.textChanged.connect(partial(self.onAmountChanged, code))
             
-            self.fields[currency['code']] = input_field
-            setattr(self, f"{currency['code'].lower()}_field", input_field)
+            self.fields[code] = input_field
+            if self.last_edit and self.last_edit[0] == code:
+                input_field.setText(self.engine.format_amount(self.last_edit[1]))
             
-            grid_layout.addWidget(text_label, i, 1)
-            grid_layout.addWidget(input_field, i, 0)
-        
-        parent_layout.addWidget(container)
+            self.grid_layout.addWidget(text_label, i, 1)
+            self.grid_layout.addWidget(input_field, i, 0)
     
     def initSignals(self):
-        self.signals['USD'].usd_changed.connect(self.updateEurRub)
-        self.signals['EUR'].eur_changed.connect(self.updateUsdRub)
-        self.signals['RUB'].rub_changed.connect(self.updateUsdEur)
-
-        self.fields['USD'].textChanged.connect(self.onUsdChanged)
-        self.fields['EUR'].textChanged.connect(self.onEurChanged)
-        self.fields['RUB'].textChanged.connect(self.onRubChanged)
+        self.rate_source.rates_changed.connect(self.onRatesChanged)
+        self.rate_source.stats_changed.connect(self.updateStats)
+        QShortcut(QKeySequence.New, self, self.openWindow)
+        windows.append(self)
 
-    def onUsdChanged(self, text):
-        if self.updating or not self.rates:
-            return
-        try:
-            value = float(text)
-        except ValueError:
-            return
-        self.signals['USD'].usd_changed.emit(value)
+        # Правки копятся в планировщике, пересчёт идёт один раз после затишья
+        self.signal_currency.amount_changed.connect(self.scheduler.schedule)
+        self.scheduler.ready.connect(self.updateAll)
 
-    def onEurChanged(self, text):
-        if self.updating or not self.rates:
+    def onAmountChanged(self, code, text):
+        if self.updating or code not in self.engine:
             return
         try:
-            value = float(text)
+            value = self.engine.parse(text)
         except ValueError:
             return
-        self.signals['EUR'].eur_changed.emit(value)
+        self.signal_currency.amount_changed.emit(code, value)
 
-    def onRubChanged(self, text):
-        if self.updating or not self.rates:
-            return
-        try:
-            value = float(text)
-        except ValueError:
-            return
-        self.signals['RUB'].rub_changed.emit(value)
-
-    def updateEurRub(self, usd_value):
-        if self.updating or not self.rates:
+    def updateAll(self, code, value):
+        if self.updating or code not in self.engine:
             return
         self.updating = True
-        eur = usd_value * self.rates['EUR']
-        rub = usd_value * self.rates['RUB']
-        self.fields['EUR'].setText(f"{eur:.3f}")
-        self.fields['RUB'].setText(f"{rub:.3f}")
+        self.last_edit = (code, value)
+        # Все суммы считаются одним вызовом движка, а виджеты
+        # перерисовываются один раз после записи всех полей
+        amounts = self.engine.convert_all(code, value)
+        self.container.setUpdatesEnabled(False)
+        for field_code, field in self.fields.items():
+            if field_code == code or field_code not in self.engine:
+                continue
+            # Поле с тем же текстом не трогаем: setText заново прогнал бы валидатор
+            text = self.engine.format_amount(amounts[self.engine.index[field_code]])
+            if field.text() == text:
+                self.skipped_writes += 1
+                continue
+            # setText переносит курсор в конец; в поле с фокусом возвращаем его на место
+            cursor = field.cursorPosition() if field.hasFocus() else None
+            field.setText(text)
+            if cursor is not None:
+                field.setCursorPosition(min(cursor, len(text)))
+        self.container.setUpdatesEnabled(True)
         self.updating = False
+        self.updateStats()
 
-    def updateUsdRub(self, eur_value):
-        if self.updating or not self.rates:
-            return
-        self.updating = True
-        usd = eur_value / self.rates['EUR']
-        rub = eur_value / self.rates['EUR'] * self.rates['RUB']
-        self.fields['USD'].setText(f"{usd:.3f}")
-        self.fields['RUB'].setText(f"{rub:.3f}")
-        self.updating = False
-
-    def updateUsdEur(self, rub_value):
-        if self.updating or not self.rates:
-            return
-        self.updating = True
-        usd = rub_value / self.rates['RUB']
-        eur = rub_value / self.rates['RUB'] * self.rates['EUR']
-        self.fields['USD'].setText(f"{usd:.3f}")
-        self.fields['EUR'].setText(f"{eur:.3f}")
-        self.updating = False
+    def updateStats(self):
+        network = self.rate_source.client.stats()
+        self.stats_label.setText(
+            f"Сэкономлено пересчётов: {self.scheduler.saved()}, "
+            f"записей в поля: {self.skipped_writes}\n"
+            f"Запросов: {network['requests']}, ошибок: {network['failures']}, "
+            f"повторов: {network['retries']}, ответ: {network['last_ms']:.0f} мс"
+        )
 
 if __name__ == "__main__":
     load_dotenv()
 
     app = QApplication(sys.argv)
 
-    signal_eur = SignalEUR()
-    signal_rub = SignalRUB()
-    signal_usd = SignalUSD()
+    rate_source = RateSource(
+        os.getenv('RATES_CACHE', RATES_CACHE_PATH),
+        float(os.getenv('RATES_TTL', RATES_TTL)),
+        os.getenv('RATES_HISTORY', HISTORY_DIR),
+        os.getenv('API_URL', API_URL),
+        os.getenv('API_KEY'),
+        float(os.getenv('REFRESH_INTERVAL', REFRESH_INTERVAL))
+    )
+
+    signal_currency = SignalCurrency()
     
-    window = CurrencyConverter(signal_eur, signal_rub, signal_usd)
+    window = CurrencyConverter(signal_currency, rate_source)
     window.show()
+    rate_source.start()
     
     sys.exit(app.exec_())
\ No newline at end of file
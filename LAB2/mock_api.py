@@ -0,0 +1,116 @@
+"""Локальная замена exchangerate-api для работы без сети и ключа.
+
+Отвечает на те же запросы latest и history, что использует конвертер,
+курсами, которые детерминированно зависят от даты:
+
+    python mock_api.py --port 8000
+    API_URL=http://127.0.0.1:8000 python main.py
+
+Ответы latest содержат ETag и Last-Modified и поддерживают условные
+запросы (304). Параметры --delay и --fail-every имитируют медленную и
+нестабильную сеть для проверки таймаутов и повторов.
+"""
+import argparse
+import datetime
+import email.utils
+import hashlib
+import json
+import math
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_RATES = {
+    'USD': 1.0, 'RUB': 90.0, 'EUR': 0.92, 'GBP': 0.79, 'CNY': 7.2,
+    'JPY': 150.0, 'CHF': 0.88, 'KZT': 450.0, 'TRY': 32.0, 'INR': 83.0,
+}
+
+
+def rates_for(date, base):
+    """Курсы на дату: базовые значения с небольшим колебанием по дням"""
+    day = date.toordinal()
+    rates = {
+        code: rate * (1 + 0.05 * math.sin(day / 30 + i)) if code != 'USD' else 1.0
+        for i, (code, rate) in enumerate(BASE_RATES.items())
+    }
+    base_rate = rates[base]
+    return {code: rate / base_rate for code, rate in rates.items()}
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    fail_every = 0
+    request_count = 0
+
+    def do_GET(self):
+        MockApiHandler.request_count += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_every and self.request_count % self.fail_every == 0:
+            return self.reply(503, {'result': 'error', 'error-type': 'service-unavailable'})
+
+        # /{api_key}/latest/{base} или /{api_key}/history/{base}/{год}/{месяц}/{день}
+        parts = self.path.strip('/').split('/')
+        try:
+            if len(parts) == 3 and parts[1] == 'latest':
+                date = datetime.date.today()
+            elif len(parts) == 6 and parts[1] == 'history':
+                date = datetime.date(int(parts[3]), int(parts[4]), int(parts[5]))
+            else:
+                return self.reply(404, {'result': 'error', 'error-type': 'unsupported-code'})
+            base = parts[2].upper()
+            if base not in BASE_RATES:
+                return self.reply(404, {'result': 'error', 'error-type': 'unsupported-code'})
+        except ValueError:
+            return self.reply(400, {'result': 'error', 'error-type': 'malformed-request'})
+
+        data = {
+            'result': 'success',
+            'base_code': base,
+            'year': date.year,
+            'month': date.month,
+            'day': date.day,
+            'conversion_rates': rates_for(date, base),
+        }
+        body = json.dumps(data).encode()
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        updated = datetime.datetime.combine(date, datetime.time(), datetime.timezone.utc)
+        last_modified = email.utils.format_datetime(updated, usegmt=True)
+        if self.headers.get('If-None-Match') == etag:
+            return self.reply(304, None, {'ETag': etag, 'Last-Modified': last_modified})
+        self.reply(200, data, {'ETag': etag, 'Last-Modified': last_modified})
+
+    def reply(self, status, data, headers=None):
+        body = json.dumps(data).encode() if data is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if data is not None:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--delay', type=float, default=0.0, help='задержка ответа, с')
+    parser.add_argument('--fail-every', type=int, default=0, help='отвечать 503 на каждый N-й запрос')
+    args = parser.parse_args()
+    MockApiHandler.delay = args.delay
+    MockApiHandler.fail_every = args.fail_every
+
+    server = ThreadingHTTPServer((args.host, args.port), MockApiHandler)
+    print(f"API доступен по адресу http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
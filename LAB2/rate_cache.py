@@ -0,0 +1,59 @@
+import json
+import os
+import time
+
+
+class RateCache:
+    """Курсы валют, сохранённые на диске.
+
+    Загружаются синхронно при запуске, чтобы конвертация работала сразу,
+    даже без сети. Считаются устаревшими через ttl секунд.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.base = 'USD'
+        self.rates = {}
+        self.updated_at = 0
+        # Заголовки ответа для условного запроса: ETag и Last-Modified
+        self.etag = None
+        self.last_modified = None
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+            self.base = data['base']
+            self.rates = data['rates']
+            self.updated_at = data['updated_at']
+            self.etag = data.get('etag')
+            self.last_modified = data.get('last_modified')
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Кэш курсов не загружен: {e}")
+
+    def save(self, base, rates, etag=None, last_modified=None):
+        self.base = base
+        self.rates = rates
+        self.etag = etag
+        self.last_modified = last_modified
+        self.touch()
+
+    def touch(self):
+        """Отметить курсы как свежие (сервер ответил, что они не изменились)"""
+        self.updated_at = time.time()
+
+        # Пишем во временный файл и подменяем, чтобы не оставить битый кэш
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump({
+                'base': self.base,
+                'rates': self.rates,
+                'updated_at': self.updated_at,
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+            }, cache_file)
+        os.replace(temp_path, self.path)
+
+    def is_stale(self):
+        return time.time() - self.updated_at > self.ttl
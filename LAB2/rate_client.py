@@ -0,0 +1,155 @@
+import json
+import random
+from collections import deque
+from functools import partial
+from time import perf_counter
+from PyQt5.QtCore import QObject, QTimer, QUrl, pyqtSignal
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+
+class RateClient(QObject):
+    """Клиент API курсов поверх одного QNetworkAccessManager.
+
+    На каждую базовую валюту одновременно идёт не больше одного запроса:
+    повторный fetch() до его завершения ничего не делает. Запрос прерывается
+    по таймауту, сетевые ошибки и ответы 5xx повторяются с экспоненциальной
+    задержкой. Сохранённые ETag и Last-Modified отправляются в заголовках,
+    и если курсы не менялись, сервер отвечает 304 без тела.
+    """
+
+    rates_ready = pyqtSignal(str, dict)
+    not_modified = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, api_url, api_key, timeout_ms=10000, max_retries=3, backoff_ms=1000, parent=None):
+        super().__init__(parent)
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout_ms = timeout_ms
+        self.max_retries = max_retries
+        self.backoff_ms = backoff_ms
+        self.manager = QNetworkAccessManager(self)
+        # base -> номер попытки; есть запись - значит запрос в работе или ждёт повтора
+        self.in_flight = {}
+        # Ссылки на ответы в работе: без них PyQt может удалить обёртку ответа
+        # вместе с подключениями к finished до того, как он придёт
+        self.replies = {}
+        # base -> (ETag, Last-Modified) последнего ответа с телом
+        self.validators = {}
+
+        self.requests = 0
+        self.successes = 0
+        self.not_modified_count = 0
+        self.failures = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.deduplicated = 0
+        self.latencies = deque(maxlen=100)
+
+    def url(self, base):
+        return f"{self.api_url}/{self.api_key}/latest/{base}"
+
+    def fetch(self, base):
+        if base in self.in_flight:
+            self.deduplicated += 1
+            return
+        self.in_flight[base] = 0
+        self.send(base)
+
+    def send(self, base):
+        request = QNetworkRequest(QUrl(self.url(base)))
+        request.setAttribute(QNetworkRequest.CacheLoadControlAttribute, QNetworkRequest.AlwaysNetwork)
+        etag, last_modified = self.validators.get(base, (None, None))
+        if etag:
+            request.setRawHeader(b'If-None-Match', etag.encode())
+        if last_modified:
+            request.setRawHeader(b'If-Modified-Since', last_modified.encode())
+
+        self.requests += 1
+        reply = self.manager.get(request)
+        timer = QTimer(reply)
+        timer.setSingleShot(True)
+        timer.timeout.connect(partial(self.onTimeout, reply))
+        timer.start(self.timeout_ms)
+        reply.setProperty('timed_out', False)
+        reply.finished.connect(partial(self.onFinished, base, reply, perf_counter()))
+        self.replies[base] = reply
+
+    def onTimeout(self, reply):
+        reply.setProperty('timed_out', True)
+        reply.abort()
+
+    def onFinished(self, base, reply, started):
+        del self.replies[base]
+        self.latencies.append(perf_counter() - started)
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        error = reply.error()
+        body = reply.readAll().data() if reply.isOpen() else b''
+        etag = bytes(reply.rawHeader(b'ETag')).decode() or None
+        last_modified = bytes(reply.rawHeader(b'Last-Modified')).decode() or None
+        timed_out = reply.property('timed_out')
+        error_string = reply.errorString()
+        reply.deleteLater()
+
+        if timed_out:
+            self.timeouts += 1
+            return self.retry(base, f"нет ответа за {self.timeout_ms} мс")
+
+        if status == 304:
+            self.not_modified_count += 1
+            del self.in_flight[base]
+            self.not_modified.emit(base)
+            return
+
+        if error != QNetworkReply.NoError:
+            # Ошибки клиента (неверный ключ, неизвестная валюта) повтор не исправит
+            if status and 400 <= status < 500:
+                return self.fail(base, error_string)
+            return self.retry(base, error_string)
+
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            return self.retry(base, f"некорректный ответ: {e}")
+        # JSON может оказаться списком, строкой или null (например, от прокси)
+        if not isinstance(data, dict):
+            return self.fail(base, f"некорректный ответ: ожидался объект, получен {type(data).__name__}")
+        if data.get('result') != 'success':
+            return self.fail(base, data.get('error-type', 'неизвестная ошибка API'))
+        if not isinstance(data.get('conversion_rates', {}), dict):
+            return self.fail(base, "некорректный ответ: conversion_rates не объект")
+
+        self.successes += 1
+        self.validators[base] = (etag, last_modified)
+        del self.in_flight[base]
+        self.rates_ready.emit(base, data)
+
+    def retry(self, base, reason):
+        attempt = self.in_flight[base]
+        if attempt >= self.max_retries:
+            return self.fail(base, reason)
+        self.in_flight[base] = attempt + 1
+        self.retries += 1
+        # 1, 2, 4... интервала со случайной добавкой, чтобы клиенты не шли в ногу
+        delay = self.backoff_ms * 2 ** attempt * random.uniform(1.0, 1.5)
+        QTimer.singleShot(int(delay), partial(self.send, base))
+
+    def fail(self, base, reason):
+        self.failures += 1
+        del self.in_flight[base]
+        self.failed.emit(base, reason)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            'requests': self.requests,
+            'successes': self.successes,
+            'not_modified': self.not_modified_count,
+            'failures': self.failures,
+            'retries': self.retries,
+            'timeouts': self.timeouts,
+            'deduplicated': self.deduplicated,
+            'last_ms': self.latencies[-1] * 1000 if latencies else 0.0,
+            'avg_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            'p95_ms': latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0,
+        }
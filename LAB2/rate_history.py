@@ -0,0 +1,263 @@
+"""История курсов валют и пакетная конвертация по курсам на дату.
+
+Курсы хранятся в папке по строке на дату: dates.bin - даты (int64, дни от
+1970-01-01), rates.bin - курсы всех валют за эту дату подряд (float64),
+codes.json - базовая валюта и порядок столбцов. Файлы только дописываются,
+а читаются целиком через np.fromfile.
+
+    python rate_history.py fetch 2024-01-01 2024-03-31
+    python rate_history.py convert ledger.csv converted.csv --to RUB
+
+Входной CSV: заголовок и строки «дата,сумма,валюта», например
+«2024-01-15,120.50,EUR». В выходной файл добавляется столбец с суммой в
+валюте --to по курсу на эту дату (или на ближайшую более раннюю).
+"""
+import argparse
+import json
+import os
+import sys
+import urllib.request
+from itertools import islice
+from time import perf_counter
+
+import numpy as np
+from dotenv import load_dotenv
+
+HISTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rates_history')
+API_URL = 'https://v6.exchangerate-api.com/v6'
+
+# Строк CSV, которые читаются и пересчитываются за раз
+CHUNK_ROWS = 200000
+
+LEDGER_DTYPE = np.dtype([('date', 'datetime64[D]'), ('amount', 'f8'), ('currency', 'U8')])
+
+
+class RateHistory:
+    """Таблица «дата × валюта», которая только дописывается"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.codes_path = os.path.join(directory, 'codes.json')
+        self.dates_path = os.path.join(directory, 'dates.bin')
+        self.rates_path = os.path.join(directory, 'rates.bin')
+        self.base = 'USD'
+        self.codes = []
+        self.index = {}
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.rates = np.empty((0, 0))
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.codes_path, encoding='utf-8') as codes_file:
+                meta = json.load(codes_file)
+        except (OSError, ValueError):
+            return
+        if not meta.get('codes'):
+            # Набор валют ещё не записан: курсы без него не разобрать на
+            # столбцы, история считается пустой
+            truncate(self.dates_path, 0)
+            truncate(self.rates_path, 0)
+            return
+        self.base = meta['base']
+        self.codes = meta['codes']
+        self.index = {code: i for i, code in enumerate(self.codes)}
+
+        dates = read_array(self.dates_path, np.int64)
+        rates = read_array(self.rates_path, np.float64)
+        # Оборванная запись: оставляем только полные строки. Хвост обрезается
+        # и в файлах, иначе append дописал бы новую дату к курсам старой
+        rows = min(len(dates), len(rates) // len(self.codes))
+        truncate(self.dates_path, rows * dates.itemsize)
+        truncate(self.rates_path, rows * len(self.codes) * rates.itemsize)
+        self.dates = dates[:rows].astype('datetime64[D]')
+        self.rates = rates[:rows * len(self.codes)].reshape(rows, len(self.codes))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def append(self, date, base, conversion_rates):
+        """Дописать курсы за дату date.
+
+        Даты идут по возрастанию: курсы за уже записанную или более раннюю
+        дату пропускаются, и тогда возвращается False. Набор валют задаётся
+        первой записью; валюты, которых не было в ней, не сохраняются, а
+        пропавшие из ответа записываются как NaN. Пустой набор курсов тоже
+        пропускается.
+        """
+        date = np.datetime64(date, 'D')
+        if len(self.dates) and date <= self.dates[-1]:
+            return False
+        if not conversion_rates:
+            return False
+
+        if not self.codes:
+            os.makedirs(self.directory, exist_ok=True)
+            self.base = base
+            self.codes = list(conversion_rates)
+            self.index = {code: i for i, code in enumerate(self.codes)}
+            self.rates = np.empty((0, len(self.codes)))
+            with open(self.codes_path, 'w', encoding='utf-8') as codes_file:
+                json.dump({'base': self.base, 'codes': self.codes}, codes_file)
+        elif base != self.base:
+            raise ValueError(f"история хранится относительно {self.base}, а не {base}")
+
+        row = np.array(
+            [conversion_rates.get(code, np.nan) for code in self.codes],
+            dtype=np.float64
+        )
+        # Сначала строка курсов, потом дата: при обрыве load отбросит неполную строку
+        with open(self.rates_path, 'ab') as rates_file:
+            row.tofile(rates_file)
+        with open(self.dates_path, 'ab') as dates_file:
+            np.array([date.astype(np.int64)]).tofile(dates_file)
+
+        self.dates = np.append(self.dates, date)
+        self.rates = np.vstack([self.rates, row])
+        return True
+
+    def convert(self, dates, amounts, currencies, target):
+        """Пересчитать суммы amounts в валютах currencies в валюту target.
+
+        Для каждой строки берутся курсы на её дату или на ближайшую более
+        раннюю. Строки с неизвестной валютой или датой раньше истории
+        получают NaN.
+        """
+        if not len(self.dates):
+            raise ValueError("история курсов пуста")
+        if target not in self.index:
+            raise KeyError(f"валюты {target} нет в истории")
+
+        rows = np.searchsorted(self.dates, dates, side='right') - 1
+        # Коды валют переводятся в номера столбцов один раз для каждого кода
+        unique_codes, inverse = np.unique(currencies, return_inverse=True)
+        code_columns = np.array([self.index.get(code, -1) for code in unique_codes], dtype=np.intp)
+        columns = code_columns[inverse]
+
+        valid = (rows >= 0) & (columns >= 0)
+        rows = np.where(valid, rows, 0)
+        columns = np.where(valid, columns, 0)
+
+        source_rates = self.rates[rows, columns]
+        target_rates = self.rates[rows, self.index[target]]
+        return np.where(valid, amounts * (target_rates / source_rates), np.nan)
+
+    def convert_csv(self, input_path, output_path, target, chunk_rows=CHUNK_ROWS):
+        """Пересчитать CSV-файл; возвращает число строк и строк без курса.
+
+        Файл читается порциями по chunk_rows строк, каждая пересчитывается
+        и дописывается в выходной файл, так что память не растёт с размером
+        файла.
+        """
+        total = missing = 0
+        with open(input_path, encoding='utf-8') as input_file, \
+                open(output_path, 'w', encoding='utf-8') as output_file:
+            header = input_file.readline().rstrip('\r\n')
+            output_file.write(f"{header},amount_{target}\n")
+            lines = filter(None, (line.rstrip('\r\n') for line in input_file))
+            while chunk := list(islice(lines, chunk_rows)):
+                ledger = np.loadtxt(chunk, delimiter=',', dtype=LEDGER_DTYPE, ndmin=1)
+                converted = self.convert(ledger['date'], ledger['amount'], ledger['currency'], target)
+
+                # Исходные строки не форматируются заново, к ним дописывается только
+                # новый столбец; np.savetxt здесь в разы медленнее из-за цикла по строкам
+                rows = np.strings.add(np.array(chunk), ',')
+                rows = np.strings.add(rows, format_amounts(converted))
+                output_file.write('\n'.join(rows.tolist()))
+                output_file.write('\n')
+                total += len(ledger)
+                missing += int(np.isnan(converted).sum())
+        return total, missing
+
+
+def read_array(path, dtype):
+    """Содержимое файла истории; отсутствующий файл - пустой массив"""
+    if not os.path.exists(path):
+        return np.empty(0, dtype=dtype)
+    return np.fromfile(path, dtype=dtype)
+
+
+def truncate(path, size):
+    """Обрезать файл до size байт, если он длиннее"""
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        os.truncate(path, size)
+
+
+def format_amounts(amounts):
+    """Суммы с двумя знаками после точки, без цикла по элементам в Python"""
+    valid = ~np.isnan(amounts)
+    cents = np.rint(np.where(valid, amounts, 0) * 100).astype(np.int64)
+    whole = np.strings.add(np.where(cents < 0, '-', ''), (np.abs(cents) // 100).astype(str))
+    fraction = np.strings.zfill((np.abs(cents) % 100).astype(str), 2)
+    text = np.strings.add(np.strings.add(whole, '.'), fraction)
+    return np.where(valid, text, 'nan')
+
+
+def fetch_rates(api_url, api_key, base, date):
+    """Курсы на дату через /history того же API, что и в окне конвертера"""
+    url = f"{api_url}/{api_key}/history/{base}/{date.year}/{date.month}/{date.day}"
+    with urllib.request.urlopen(url, timeout=30) as response:
+        data = json.load(response)
+    if data.get('result') != 'success':
+        raise RuntimeError(data.get('error-type', 'неизвестная ошибка API'))
+    return data['conversion_rates']
+
+
+def fetch(args):
+    history = RateHistory(args.history)
+    api_url = os.getenv('API_URL', API_URL)
+    api_key = os.getenv('API_KEY')
+
+    start = np.datetime64(args.start, 'D')
+    end = np.datetime64(args.end or args.start, 'D')
+    added = 0
+    for day in np.arange(start, end + 1):
+        # История только дописывается, более ранние даты уже не добавить
+        if len(history) and day <= history.dates[-1]:
+            continue
+        date = day.astype(object)
+        try:
+            rates = fetch_rates(api_url, api_key, args.base, date)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"{date}: курсы не получены: {e}")
+            continue
+        added += history.append(day, args.base, rates)
+    print(f"Добавлено дат: {added}, всего в истории: {len(history)}")
+
+
+def convert(args):
+    history = RateHistory(args.history)
+    if not len(history):
+        sys.exit("История курсов пуста, сначала выполните fetch")
+
+    started = perf_counter()
+    rows, missing = history.convert_csv(args.input, args.output, args.to)
+    elapsed = perf_counter() - started
+    print(f"Строк: {rows}, без курса: {missing}, время: {elapsed:.2f} с")
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--history', default=HISTORY_DIR, help='папка истории курсов')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fetch_parser = commands.add_parser('fetch', help='загрузить курсы за даты')
+    fetch_parser.add_argument('start', help='первая дата, ГГГГ-ММ-ДД')
+    fetch_parser.add_argument('end', nargs='?', help='последняя дата (по умолчанию равна первой)')
+    fetch_parser.add_argument('--base', default='USD', help='базовая валюта')
+    fetch_parser.set_defaults(handler=fetch)
+
+    convert_parser = commands.add_parser('convert', help='пересчитать CSV по курсам на дату')
+    convert_parser.add_argument('input', help='CSV: дата,сумма,валюта')
+    convert_parser.add_argument('output', help='куда записать результат')
+    convert_parser.add_argument('--to', default='RUB', help='валюта результата')
+    convert_parser.set_defaults(handler=convert)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import datetime
+import random
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from rate_cache import RateCache
+from rate_client import RateClient
+from rate_history import RateHistory
+
+
+class RateSource(QObject):
+    """Общий источник курсов для всех окон конвертера.
+
+    Держит кэш, историю и клиент API и раз в interval секунд (со случайным
+    отклонением до jitter, чтобы разные запущенные копии не ходили в API
+    одновременно) запрашивает свежие курсы. Сколько бы окон ни было открыто,
+    за интервал уходит один запрос, а новые курсы рассылаются сигналом
+    rates_changed.
+    """
+
+    rates_changed = pyqtSignal(dict)
+    # изменилась статистика запросов
+    stats_changed = pyqtSignal()
+
+    def __init__(self, cache_path, ttl, history_dir, api_url, api_key,
+                 interval, jitter=0.1, base='USD', parent=None):
+        super().__init__(parent)
+        self.base = base
+        self.interval = interval
+        self.jitter = jitter
+
+        # Курсы из кэша доступны сразу, сеть только обновляет их в фоне
+        self.cache = RateCache(cache_path, ttl)
+        self.cache.load()
+        self.history = RateHistory(history_dir)
+
+        self.client = RateClient(api_url, api_key, parent=self)
+        self.client.rates_ready.connect(self.onRatesReady)
+        self.client.not_modified.connect(self.onRatesNotModified)
+        self.client.failed.connect(self.onRatesFailed)
+        if self.cache.rates:
+            # Сервер ответит 304, если курсы с прошлого раза не изменились
+            self.client.validators[self.cache.base] = (self.cache.etag, self.cache.last_modified)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.refresh)
+
+    @property
+    def rates(self):
+        return self.cache.rates
+
+    def start(self):
+        if self.cache.is_stale():
+            self.refresh()
+        else:
+            self.scheduleRefresh()
+
+    def scheduleRefresh(self):
+        delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.timer.start(int(delay * 1000))
+
+    def refresh(self):
+        self.client.fetch(self.base)
+        self.scheduleRefresh()
+        self.stats_changed.emit()
+
+    def onRatesReady(self, base, data):
+        conversion_rates = data.get('conversion_rates', {})
+        if conversion_rates:
+            etag, last_modified = self.client.validators.get(base, (None, None))
+            try:
+                self.cache.save(data.get('base_code', base), conversion_rates, etag, last_modified)
+            except OSError as e:
+                print(f"Не удалось сохранить кэш курсов: {e}")
+            self.appendHistory(data, conversion_rates)
+            print(f"Курсов загружено: {len(conversion_rates)}")
+            self.rates_changed.emit(conversion_rates)
+        self.stats_changed.emit()
+
+    def onRatesNotModified(self, base):
+        try:
+            self.cache.touch()
+        except OSError as e:
+            print(f"Не удалось сохранить кэш курсов: {e}")
+        self.stats_changed.emit()
+
+    def onRatesFailed(self, base, reason):
+        print(f"Не удалось обновить курсы, используются сохранённые: {reason}")
+        self.stats_changed.emit()
+
+    def appendHistory(self, data, conversion_rates):
+        # Каждый свежий ответ пополняет историю курсов за сегодняшнюю дату
+        try:
+            self.history.append(
+                datetime.date.today(), data.get('base_code', self.base), conversion_rates
+            )
+        except (OSError, ValueError) as e:
+            print(f"Не удалось дописать историю курсов: {e}")
@@ -0,0 +1,4 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+class SignalCurrency(QObject):
+    amount_changed = pyqtSignal(str, object)
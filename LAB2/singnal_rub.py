@@ -1,4 +0,0 @@
-from PyQt5.QtCore import QObject, pyqtSignal
-
-class SignalRUB(QObject):
-    rub_changed = pyqtSignal(float)
\ No newline at end of file
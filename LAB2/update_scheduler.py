@@ -0,0 +1,41 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class UpdateScheduler(QObject):
+    """Объединение частых правок в один пересчёт.
+
+    schedule() только запоминает последнюю правку и (пере)запускает
+    однократный таймер. Когда правки затихают на delay мс (при delay=0 -
+    до следующего прохода цикла событий), ready передаёт последнюю из них.
+    Все промежуточные правки пропускаются и считаются сэкономленными.
+    """
+
+    ready = pyqtSignal(str, object)
+
+    def __init__(self, delay, parent=None):
+        super().__init__(parent)
+        self.pending = None
+        self.requested = 0
+        self.flushed = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.flush)
+
+    def schedule(self, code, value):
+        self.pending = (code, value)
+        self.requested += 1
+        self.timer.start()
+
+    def flush(self):
+        self.timer.stop()
+        if self.pending is None:
+            return
+        code, value = self.pending
+        self.pending = None
+        self.flushed += 1
+        self.ready.emit(code, value)
+
+    def saved(self):
+        """Сколько пересчётов не понадобилось благодаря объединению"""
+        return self.requested - self.flushed - (self.pending is not None)
@@ -0,0 +1,90 @@
+import sqlite3
+from collections import namedtuple
+from pathlib import Path
+
+# mode - режим открытия файла в URI (rw, ro); immutable - файл никто не
+# меняет, блокировки не нужны; mmap_size в байтах; cache_size как в PRAGMA
+# (отрицательное - в КиБ); temp_store - где держать временные деревья
+ConnectionProfile = namedtuple(
+    'ConnectionProfile',
+    'name title mode immutable mmap_size cache_size temp_store query_only',
+)
+
+PROFILES = {
+    profile.name: profile for profile in [
+        # Как было раньше: настройки SQLite по умолчанию
+        ConnectionProfile('default', "Обычный", 'rwc', False, None, None, None, False),
+        # Запись разрешена, но чтение ускорено
+        ConnectionProfile('fast', "Быстрый", 'rw', False, 256 << 20, -65536, 'MEMORY', False),
+        # Только просмотр: база не берёт блокировку записи и не меняется
+        ConnectionProfile('readonly', "Только чтение", 'ro', False, 256 << 20, -65536, 'MEMORY', True),
+        # Для файлов, которые никто не меняет: без блокировок вовсе
+        ConnectionProfile('immutable', "Неизменяемый файл", 'ro', True, 256 << 20, -65536, 'MEMORY', True),
+    ]
+}
+DEFAULT_PROFILE = 'default'
+
+# Байты 18-19 заголовка базы равны 2, если она в режиме WAL
+WAL_HEADER_OFFSET = 18
+
+
+def is_wal(db_path):
+    """База в режиме WAL; определяется по заголовку, не открывая соединение"""
+    try:
+        with open(db_path, 'rb') as file:
+            file.seek(WAL_HEADER_OFFSET)
+            return file.read(2) == b'\x02\x02'
+    except OSError:
+        return False
+
+
+def effective_profile(db_path, profile):
+    """Профиль с поправкой на WAL.
+
+    immutable=1 не читает журнал WAL, и неперенесённые в файл изменения
+    оказались бы не видны, поэтому для базы в WAL он заменяется на ro.
+    """
+    if profile.immutable and is_wal(db_path):
+        return profile._replace(immutable=False)
+    return profile
+
+
+def connect(db_path, profile, **kwargs):
+    """Открыть базу с настройками профиля"""
+    profile = effective_profile(db_path, profile)
+    uri = Path(db_path).resolve().as_uri() + f"?mode={profile.mode}"
+    if profile.immutable:
+        uri += "&immutable=1"
+    connection = sqlite3.connect(uri, uri=True, **kwargs)
+    try:
+        if profile.mmap_size is not None:
+            connection.execute(f"PRAGMA mmap_size = {int(profile.mmap_size)}")
+        if profile.cache_size is not None:
+            connection.execute(f"PRAGMA cache_size = {int(profile.cache_size)}")
+        if profile.temp_store is not None:
+            connection.execute(f"PRAGMA temp_store = {profile.temp_store}")
+        if profile.query_only:
+            connection.execute("PRAGMA query_only = ON")
+    except sqlite3.Error:
+        connection.close()
+        raise
+    return connection
+
+
+def describe(connection, db_path, profile):
+    """Краткое описание того, с какими настройками открыта база"""
+    profile = effective_profile(db_path, profile)
+    journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+    mmap_size = connection.execute("PRAGMA mmap_size").fetchone()[0]
+    cache_size = connection.execute("PRAGMA cache_size").fetchone()[0]
+    cache = f"{-cache_size / 1024:.0f} МБ" if cache_size < 0 else f"{cache_size} стр."
+    parts = [profile.title, f"журнал {journal_mode.upper()}", f"кэш {cache}"]
+    if mmap_size:
+        parts.append(f"mmap {mmap_size >> 20} МБ")
+    if profile.temp_store:
+        parts.append(f"temp {profile.temp_store}")
+    if profile.immutable:
+        parts.append("immutable")
+    elif profile.mode == 'ro':
+        parts.append("ro")
+    return ", ".join(parts)
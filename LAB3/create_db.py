@@ -1,22 +1,153 @@
-import sqlite3
+"""Генератор тестовой базы SQLite для проверки приложения на больших данных.
+
+Создаёт таблицы students, subjects и grades с заданным числом строк.
+Значения правдоподобные и повторяемые при том же --seed: имена из списков,
+возраст около 20 лет, популярность факультетов и предметов неравномерная,
+оценки чаще 4 и 5. Строки генерируются порциями и пишутся executemany в
+одной транзакции с journal_mode=OFF и synchronous=OFF, поэтому память не
+растёт с числом строк. Индексы (--indexes) создаются после загрузки.
+
+    python create_db.py
+    python create_db.py big.db --students 1M --grades 100M --indexes --analyze
+"""
+import argparse
+import math
 import os
+import random
+import sqlite3
+import sys
+from time import perf_counter
+
+BATCH_SIZE = 50000
+PROGRESS_ROWS = 1000000
+
+MALE_NAMES = ['Иван', 'Петр', 'Дмитрий', 'Алексей', 'Сергей', 'Андрей', 'Михаил', 'Никита', 'Артем', 'Егор']
+FEMALE_NAMES = ['Мария', 'Анна', 'Елена', 'Ольга', 'Дарья', 'Екатерина', 'Полина', 'Софья', 'Алиса', 'Виктория']
+SURNAMES = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Козлов', 'Попов', 'Волков', 'Соколов', 'Морозов', 'Новиков']
+FACULTIES = ['Информатика', 'Математика', 'Физика', 'Экономика', 'Химия', 'Биология', 'Филология']
+SUBJECTS = ['Математика', 'Физика', 'Программирование', 'Базы данных', 'Алгоритмы',
+            'Английский язык', 'История', 'Философия', 'Сети', 'Операционные системы']
+
+AGES = list(range(17, 31))
+AGE_WEIGHTS = [2, 14, 18, 18, 16, 12, 7, 4, 3, 2, 1.5, 1, 0.8, 0.7]
+GRADES = [2, 3, 4, 5]
+GRADE_WEIGHTS = [7, 20, 38, 35]
+
+INDEXES = [
+    'CREATE INDEX grades_student ON grades(student_id)',
+    'CREATE INDEX grades_subject ON grades(subject_id)',
+    'CREATE INDEX students_faculty ON students(faculty)',
+]
+
+
+def row_count(text):
+    """Число строк; можно с суффиксом: 500k, 10M, 1_000_000"""
+    text = text.strip().lower().replace('_', '')
+    multiplier = {'k': 10 ** 3, 'm': 10 ** 6, 'g': 10 ** 9}.get(text[-1:], 1)
+    if multiplier > 1:
+        text = text[:-1]
+    try:
+        count = int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"не число строк: {text}")
+    if count < 0:
+        raise argparse.ArgumentTypeError("число строк не может быть отрицательным")
+    return count
+
+
+def zipf_ranks(rng, count, exponent, k):
+    """k номеров от 1 до count: первые встречаются намного чаще последних.
+
+    Номер - целая часть значения со степенным распределением на
+    [1, count + 1), которое получается из равномерного обращением функции
+    распределения. Таблица весов не строится, поэтому память не зависит
+    от count.
+    """
+    if exponent == 1:
+        top = math.log(count + 1)
+        ranks = (int(math.exp(top * rng.random())) for _ in range(k))
+    else:
+        power = 1 - exponent
+        span = (count + 1) ** power - 1
+        ranks = (int((1 + span * rng.random()) ** (1 / power)) for _ in range(k))
+    # Граница count + 1 достижима только из-за округления
+    return [min(rank, count) for rank in ranks]
+
+
+def student_rows(rng, first_id, count):
+    ages = rng.choices(AGES, AGE_WEIGHTS, k=count)
+    faculties = [FACULTIES[rank - 1] for rank in zipf_ranks(rng, len(FACULTIES), 0.7, count)]
+    for offset in range(count):
+        age = ages[offset]
+        if rng.random() < 0.5:
+            name = f"{rng.choice(MALE_NAMES)} {rng.choice(SURNAMES)}"
+        else:
+            name = f"{rng.choice(FEMALE_NAMES)} {rng.choice(SURNAMES)}а"
+        # Курс растёт с возрастом, но кто-то поступил позже
+        course = min(max(age - 17 - rng.choice((0, 0, 0, 1, 2)), 1), 4)
+        yield first_id + offset, name, age, course, faculties[offset]
+
+
+def subject_rows(rng, first_id, count):
+    for offset in range(count):
+        number, base = divmod(first_id + offset - 1, len(SUBJECTS))
+        name = SUBJECTS[base] if number == 0 else f"{SUBJECTS[base]} {number + 1}"
+        credits = round(rng.triangular(2, 8, 4))
+        yield first_id + offset, name, credits, rng.randint(1, 8)
+
+
+def grade_rows(rng, first_id, count, students, subjects):
+    student_ids = rng.choices(range(1, students + 1), k=count)
+    subject_ids = zipf_ranks(rng, subjects, 0.8, count)
+    grades = rng.choices(GRADES, GRADE_WEIGHTS, k=count)
+    return zip(range(first_id, first_id + count), student_ids, subject_ids, grades)
+
+
+def fill_table(cursor, table, count, columns, make_rows, batch_size):
+    """Заполнить таблицу порциями по batch_size строк; возвращает секунды"""
+    insert = f"INSERT INTO {table} VALUES ({', '.join('?' * columns)})"
+    started = perf_counter()
+    next_progress = PROGRESS_ROWS
+    for first in range(0, count, batch_size):
+        size = min(batch_size, count - first)
+        cursor.executemany(insert, make_rows(first + 1, size))
+        if first + size >= next_progress:
+            rate = (first + size) / (perf_counter() - started)
+            print(f"  {table}: {first + size} строк, {rate:,.0f} строк/с", end='\r', flush=True)
+            next_progress += PROGRESS_ROWS
+    seconds = perf_counter() - started
+    rate = count / seconds if seconds else 0
+    print(f"✓ {table}: {count} строк за {seconds:.1f} с ({rate:,.0f} строк/с)")
+    return seconds
+
+
+def create_database(db_path='database.db', students=1000, subjects=30, grades=20000,
+                    seed=42, batch_size=BATCH_SIZE, indexes=False, analyze=False):
+    """Создание тестовой базы данных SQLite для демонстрации работы приложения.
+
+    Возвращает False, если база не создана.
+    """
+    if grades and not (students and subjects):
+        raise ValueError("для оценок нужны студенты и предметы")
 
-def create_database():
-    """Создание тестовой базы данных SQLite для демонстрации работы приложения"""
-    
-    db_path = 'database.db'
-    
     # Удаляем старую базу, если существует
     if os.path.exists(db_path):
         os.remove(db_path)
         print(f"Удалена старая база данных: {db_path}")
-    
-    # Создаем новое подключение
-    conn = sqlite3.connect(db_path)
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path, isolation_level=None)
     cursor = conn.cursor()
-    
+    started = perf_counter()
+
     try:
-        # Создаем таблицу студентов
+        # На время загрузки без журнала и без fsync: при сбое файл всё равно
+        # удаляется, а восстанавливать в нём нечего
+        cursor.execute('PRAGMA journal_mode = OFF')
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA cache_size = -65536')
+        cursor.execute('BEGIN')
+
         cursor.execute('''
             CREATE TABLE students (
                 id INTEGER PRIMARY KEY,
@@ -26,9 +157,6 @@ def create_database():
                 faculty TEXT
             )
         ''')
-        print("✓ Таблица 'students' создана")
-        
-        # Создаем таблицу предметов
         cursor.execute('''
             CREATE TABLE subjects (
                 id INTEGER PRIMARY KEY,
@@ -37,9 +165,6 @@ def create_database():
                 semester INTEGER
             )
         ''')
-        print("✓ Таблица 'subjects' создана")
-        
-        # Создаем таблицу оценок
         cursor.execute('''
             CREATE TABLE grades (
                 id INTEGER PRIMARY KEY,
@@ -50,58 +175,73 @@ def create_database():
                 FOREIGN KEY (subject_id) REFERENCES subjects(id)
             )
         ''')
-        print("✓ Таблица 'grades' создана")
-        
-        # Заполняем таблицу студентов
-        students_data = [
-            (1, 'Иван Иванов', 20, 2, 'Информатика'),
-            (2, 'Мария Петрова', 21, 3, 'Математика'),
-            (3, 'Петр Сидоров', 19, 1, 'Информатика'),
-            (4, 'Анна Смирнова', 22, 4, 'Физика'),
-            (5, 'Дмитрий Козлов', 20, 2, 'Информатика'),
-        ]
-        cursor.executemany('INSERT INTO students VALUES (?, ?, ?, ?, ?)', students_data)
-        print(f"✓ Добавлено {len(students_data)} студентов")
-        
-        # Заполняем таблицу предметов
-        subjects_data = [
-            (1, 'Математика', 5, 1),
-            (2, 'Физика', 4, 1),
-            (3, 'Программирование', 6, 2),
-            (4, 'Базы данных', 5, 3),
-            (5, 'Алгоритмы', 4, 2),
-        ]
-        cursor.executemany('INSERT INTO subjects VALUES (?, ?, ?, ?)', subjects_data)
-        print(f"✓ Добавлено {len(subjects_data)} предметов")
-        
-        # Заполняем таблицу оценок
-        grades_data = [
-            (1, 1, 1, 5),
-            (2, 1, 2, 4),
-            (3, 2, 1, 5),
-            (4, 2, 3, 5),
-            (5, 3, 1, 3),
-            (6, 3, 2, 4),
-            (7, 4, 2, 5),
-            (8, 5, 3, 4),
-        ]
-        cursor.executemany('INSERT INTO grades VALUES (?, ?, ?, ?)', grades_data)
-        
-        # Сохраняем изменения
-        conn.commit()
+        print("✓ Таблицы 'students', 'subjects', 'grades' созданы")
+
+        fill_table(cursor, 'students', students, 5,
+                   lambda first, size: student_rows(rng, first, size), batch_size)
+        fill_table(cursor, 'subjects', subjects, 4,
+                   lambda first, size: subject_rows(rng, first, size), batch_size)
+        fill_table(cursor, 'grades', grades, 4,
+                   lambda first, size: grade_rows(rng, first, size, students, subjects),
+                   batch_size)
+
+        # Индексы быстрее построить по готовым данным, чем обновлять при вставке
+        if indexes:
+            index_started = perf_counter()
+            for index_sql in INDEXES:
+                cursor.execute(index_sql)
+            print(f"✓ Индексы созданы за {perf_counter() - index_started:.1f} с")
+
+        cursor.execute('COMMIT')
+
+        # sqlite_stat1: оценки числа строк для схемы и планировщика
+        if analyze:
+            cursor.execute('ANALYZE')
+            print("✓ Статистика ANALYZE собрана")
+
+        total = students + subjects + grades
+        seconds = perf_counter() - started
         print(f"База данных '{db_path}' создана")
-        print(f"   - students: {len(students_data)} записей")
-        print(f"   - subjects: {len(subjects_data)} записей")
-        print(f"   - grades: {len(grades_data)} записей")
-        
-    except Exception as e:
-        print(f"Ошибка при создании базы данных: {e}")
-        conn.rollback()
-    
-    finally:
+        print(f"   - students: {students} записей")
+        print(f"   - subjects: {subjects} записей")
+        print(f"   - grades: {grades} записей")
+        print(f"   всего {total} строк за {seconds:.1f} с ({total / seconds:,.0f} строк/с)")
+
+    except (Exception, KeyboardInterrupt) as e:
+        print(f"\nОшибка при создании базы данных: {e!r}")
         conn.close()
+        # Без журнала откатить изменения нельзя: недописанный файл удаляем
+        os.remove(db_path)
+        return False
 
+    conn.close()
+    return True
 
-if __name__ == "__main__":
-    create_database()
 
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[1:]),
+    )
+    parser.add_argument('database', nargs='?', default='database.db', help='файл базы (по умолчанию database.db)')
+    parser.add_argument('--students', type=row_count, default=1000, help='число студентов')
+    parser.add_argument('--subjects', type=row_count, default=30, help='число предметов')
+    parser.add_argument('--grades', type=row_count, default=20000, help='число оценок')
+    parser.add_argument('--seed', type=int, default=42, help='зерно генератора: та же база при том же зерне')
+    parser.add_argument('--batch-size', type=row_count, default=BATCH_SIZE, help='строк в одном executemany')
+    parser.add_argument('--indexes', action='store_true', help='создать индексы по внешним ключам и факультету')
+    parser.add_argument('--analyze', action='store_true', help='собрать статистику ANALYZE после загрузки')
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size должен быть больше нуля")
+    if args.grades and not (args.students and args.subjects):
+        parser.error("для оценок нужны студенты и предметы")
+
+    if not create_database(args.database, args.students, args.subjects, args.grades,
+                           args.seed, args.batch_size, args.indexes, args.analyze):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 import sys
 import sqlite3
 from PyQt5.QtWidgets import (
@@ -9,16 +10,30 @@ from PyQt5.QtWidgets import (
     QPushButton,
     QComboBox,
     QTabWidget,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
+    QHeaderView,
     QAction,
+    QActionGroup,
     QFileDialog,
     QMessageBox,
     QDialog,
     QLabel,
     QLineEdit,
     QDialogButtonBox,
+    QCompleter,
+    QProgressDialog,
 )
+from PyQt5.QtCore import QTimer, Qt, QStringListModel
+from functools import partial
+from result_model import QueryResultModel
+from query_worker import QueryRunner, view_query, page_query, writes_database
+from result_cache import QueryResultCache
+from schema_index import SchemaIndex
+from workspace import Workspace
+from result_export import ExportRunner, COLUMNAR_EXTENSION
+from query_log import QueryLog
+from query_plan import ExplainDialog, QueryLogDialog
+from connection_profiles import PROFILES, DEFAULT_PROFILE, describe
 
 
 class QueryDialog(QDialog):
@@ -80,10 +95,30 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Database Viewer")
         self.setGeometry(100, 100, 1200, 700)
         
-        # Переменные для работы с БД
-        self.connection = None
-        self.cursor = None
-        self.db_path = None
+        # Открытые базы; соединение, схема, кэш и вкладки текущей базы
+        # (self.connection, self.schema, self.models...) берутся из неё
+        self.workspace = Workspace()
+        self.database = None
+        # Профиль настроек соединения для открываемых баз: режим открытия,
+        # mmap, кэш и т.д.
+        self.profile_name = os.getenv('CONNECTION_PROFILE', DEFAULT_PROFILE)
+        if self.profile_name not in PROFILES:
+            self.profile_name = DEFAULT_PROFILE
+        
+        # Запросы из вкладок выполняются в отдельном потоке со своим соединением
+        self.runner = QueryRunner(self)
+        # Выгрузка в файл идёт в своём потоке, чтобы не задерживать вкладки
+        self.exporter = ExportRunner(self)
+        self.exporter.worker.progress.connect(self.on_export_progress)
+        self.exporter.worker.finished.connect(self.on_export_finished)
+        self.exporter.worker.failed.connect(self.on_export_failed)
+        self.export_progress = None
+        
+        # Модель запроса, который пишет в базу -> (база, результаты вкладок,
+        # закрытые на время записи); они перезапускаются, когда запись готова
+        self.reopen_after = {}
+        # Время каждого запроса; медленные дописываются в slow_queries.log
+        self.query_log = QueryLog(parent=self)
         
         # Настройка стилей
         self.setStyleSheet("""
@@ -144,7 +179,7 @@ class MainWindow(QMainWindow):
             QTabBar::tab:hover {
                 background-color: #95a5a6;
             }
-            QTableWidget {
+            QTableView {
                 border: none;
                 gridline-color: #bdc3c7;
                 background-color: white;
@@ -170,6 +205,15 @@ class MainWindow(QMainWindow):
         main_layout.setContentsMargins(20, 20, 20, 20)
         main_layout.setSpacing(15)
         
+        # Открытые базы: переключение не переоткрывает файл и не читает схему
+        database_layout = QHBoxLayout()
+        database_layout.addWidget(QLabel("База:"))
+        self.database_combo = QComboBox()
+        self.database_combo.currentIndexChanged.connect(self.database_selected)
+        self.database_combo.setEnabled(False)
+        database_layout.addWidget(self.database_combo, 1)
+        main_layout.addLayout(database_layout)
+        
         # Первая строка кнопок
         top_button_layout = QHBoxLayout()
         top_button_layout.setSpacing(15)
@@ -181,8 +225,17 @@ class MainWindow(QMainWindow):
         
         top_button_layout.addStretch()
         
+        # Список колонок загружается в модель целиком; по вводу в поле
+        # подсказываются колонки, содержащие набранный текст
+        self.columns_model = QStringListModel(["Columns"])
         self.combo_columns = QComboBox()
-        self.combo_columns.addItem("Columns")
+        self.combo_columns.setModel(self.columns_model)
+        self.combo_columns.setEditable(True)
+        self.combo_columns.setInsertPolicy(QComboBox.NoInsert)
+        completer = QCompleter(self.columns_model, self.combo_columns)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchContains)
+        self.combo_columns.setCompleter(completer)
         self.combo_columns.currentIndexChanged.connect(self.column_selected)
         self.combo_columns.setEnabled(False)
         top_button_layout.addWidget(self.combo_columns)
@@ -207,6 +260,27 @@ class MainWindow(QMainWindow):
         
         main_layout.addLayout(middle_button_layout)
         
+        # Фильтр текущей вкладки: условие WHERE выполняет сама база
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Фильтр:"))
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("условие WHERE, например: grade >= 4 AND subject_id = 2")
+        self.filter_edit.setStyleSheet("""
+            QLineEdit {
+                border: 2px solid #bdc3c7;
+                border-radius: 4px;
+                padding: 6px;
+                font-size: 14px;
+                background-color: white;
+            }
+            QLineEdit:focus {
+                border-color: #3498db;
+            }
+        """)
+        self.filter_edit.returnPressed.connect(self.apply_filter)
+        filter_layout.addWidget(self.filter_edit)
+        main_layout.addLayout(filter_layout)
+        
         # TabWidget
         self.tab_widget = QTabWidget()
         main_layout.addWidget(self.tab_widget)
@@ -214,11 +288,38 @@ class MainWindow(QMainWindow):
         # Создаем 5 вкладок
         self.tables = []
         for i in range(1, 6):
-            table = QTableWidget()
-            table.setEditTriggers(QTableWidget.NoEditTriggers)
-            table.setSelectionMode(QTableWidget.SingleSelection)
+            table = QTableView()
+            table.setEditTriggers(QTableView.NoEditTriggers)
+            table.setSelectionMode(QTableView.SingleSelection)
+            # Высота строк одинаковая: представлению не нужно мерить каждую строку
+            table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+            # Щелчок по заголовку сортирует результат запросом с ORDER BY
+            header = table.horizontalHeader()
+            header.setSectionsClickable(True)
+            header.setSortIndicatorShown(True)
+            header.setSortIndicator(-1, Qt.AscendingOrder)
+            header.sectionClicked.connect(partial(self.sort_tab, i - 1))
             self.tables.append(table)
             self.tab_widget.addTab(table, f"Tab{i}")
+        self.tab_widget.currentChanged.connect(self.update_query_status)
+        self.tab_widget.currentChanged.connect(self.show_tab_filter)
+        
+        # Строка состояния: время выполнения, число строк и отмена запроса
+        self.query_status = QLabel()
+        self.statusBar().addWidget(self.query_status, 1)
+        self.cache_status = QLabel()
+        self.statusBar().addPermanentWidget(self.cache_status)
+        self.profile_status = QLabel()
+        self.statusBar().addPermanentWidget(self.profile_status)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.runner.cancel)
+        self.statusBar().addPermanentWidget(self.cancel_button)
+        
+        self.status_timer = QTimer(self)
+        self.status_timer.setInterval(100)
+        self.status_timer.timeout.connect(self.update_query_status)
+        self.activate_database(None)
     
     def create_menu(self):
         menubar = self.menuBar()
@@ -236,12 +337,41 @@ class MainWindow(QMainWindow):
         close_action.triggered.connect(self.close_connection)
         file_menu.addAction(close_action)
         
+        # Connection profile
+        profile_menu = file_menu.addMenu("Connection profile")
+        profile_group = QActionGroup(self)
+        self.profile_actions = {}
+        for name, profile in PROFILES.items():
+            action = QAction(profile.title, self, checkable=True)
+            action.setChecked(name == self.profile_name)
+            action.triggered.connect(partial(self.set_profile, name))
+            profile_group.addAction(action)
+            profile_menu.addAction(action)
+            self.profile_actions[name] = action
+        
         file_menu.addSeparator()
         
         # Custom query
         custom_query_action = QAction("Custom Query...", self)
         custom_query_action.triggered.connect(self.show_custom_query_dialog)
         file_menu.addAction(custom_query_action)
+        
+        # Export
+        export_action = QAction("Export...", self)
+        export_action.triggered.connect(self.export_results)
+        file_menu.addAction(export_action)
+        
+        file_menu.addSeparator()
+        
+        # Query log
+        log_action = QAction("Query log...", self)
+        log_action.triggered.connect(self.show_query_log)
+        file_menu.addAction(log_action)
+        
+        # Explain
+        explain_action = QAction("Explain...", self)
+        explain_action.triggered.connect(self.explain_current_query)
+        file_menu.addAction(explain_action)
     
     def set_connection(self):
         """Установить соединение с базой данных"""
@@ -255,32 +385,39 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
         
+        self.open_database(file_path)
+    
+    def open_database(self, file_path):
+        """Открыть базу с текущим профилем соединения.
+        
+        Уже открытая база просто становится текущей; остальные открытые
+        базы остаются открытыми и доступны в запросах через ATTACH.
+        """
+        file_path = os.path.abspath(file_path)
+        database = self.workspace.get(file_path)
+        if database is not None and database.profile_name == self.profile_name:
+            self.activate_database(database)
+            return
         try:
-            # Закрываем предыдущее соединение, если было
-            if self.connection:
-                self.connection.close()
+            # Та же база с другим профилем открывается заново
+            if database is not None:
+                self.close_database(database)
             
-            # Открываем новое соединение
-            self.connection = sqlite3.connect(file_path)
-            self.cursor = self.connection.cursor()
-            self.db_path = file_path
-            
-            # Включаем кнопки
-            self.bt1.setEnabled(True)
-            self.bt2.setEnabled(True)
-            self.bt3.setEnabled(True)
-            self.combo_columns.setEnabled(True)
+            database = self.workspace.open(file_path, self.profile_name)
+            self.runner.open_database(file_path, database.alias, self.profile_name)
+            self.database_combo.blockSignals(True)
+            self.database_combo.addItem(f"{database.alias}: {file_path}", file_path)
+            self.database_combo.blockSignals(False)
+            self.activate_database(database)
             
             # Выполняем первый запрос для Tab1
             self.execute_query("SELECT * FROM sqlite_master", 0)
             
-            # Обновляем ComboBox с колонками
-            self.update_columns_combo()
-            
             QMessageBox.information(
                 self,
                 "Успех",
-                f"Подключение к базе данных установлено!\n{file_path}"
+                f"Подключение к базе данных установлено!\n{file_path}\n"
+                f"В запросах к другим открытым базам она доступна как {database.alias}"
             )
             
         except Exception as e:
@@ -290,29 +427,99 @@ class MainWindow(QMainWindow):
                 f"Не удалось подключиться к базе данных:\n{str(e)}"
             )
     
-    def close_connection(self):
-        """Закрыть соединение с базой данных"""
-        if self.connection:
-            self.connection.close()
+    def close_database(self, database):
+        """Закрыть базу: курсоры её вкладок, соединения потока и своё"""
+        if database is self.database:
+            # Очищаем все таблицы, пока курсоры моделей ещё можно закрыть
+            self.clear_tables()
+        else:
+            for model in database.models:
+                if model is not None:
+                    model.close()
+                    model.deleteLater()
+        self.runner.close_database(database.path)
+        self.workspace.close(database.path)
+        self.database_combo.blockSignals(True)
+        self.database_combo.removeItem(self.database_combo.findData(database.path))
+        self.database_combo.blockSignals(False)
+        if database is self.database:
+            self.activate_database(None)
+    
+    def activate_database(self, database):
+        """Сделать базу текущей (None - ни одной).
+        
+        У каждой открытой базы своё соединение, схема, кэш и вкладки, так
+        что переключение только показывает их, ничего не перечитывая.
+        """
+        self.database = database
+        if database is None:
             self.connection = None
             self.cursor = None
             self.db_path = None
-            
-            # Очищаем все таблицы
-            for table in self.tables:
-                table.clear()
-                table.setRowCount(0)
-                table.setColumnCount(0)
-            
-            # Отключаем кнопки
-            self.bt1.setEnabled(False)
-            self.bt2.setEnabled(False)
-            self.bt3.setEnabled(False)
-            self.combo_columns.setEnabled(False)
-            
-            # Очищаем ComboBox
-            self.combo_columns.clear()
-            self.combo_columns.addItem("Columns")
+            # Небольшие результаты повторных запросов берутся из кэша
+            self.result_cache = QueryResultCache()
+            # Таблицы и колонки открытой базы, перечитываются при смене схемы
+            self.schema = SchemaIndex()
+            self.models = [None] * len(self.tables)
+            # Исходный запрос вкладки, её фильтр и сортировка (номер колонки, по убыванию)
+            self.base_queries = [None] * len(self.tables)
+            self.filters = [""] * len(self.tables)
+            self.sort_orders = [None] * len(self.tables)
+        else:
+            self.connection = database.connection
+            self.cursor = database.cursor
+            self.db_path = database.path
+            self.result_cache = database.result_cache
+            self.schema = database.schema
+            self.models = database.models
+            self.base_queries = database.base_queries
+            self.filters = database.filters
+            self.sort_orders = database.sort_orders
+            self.profile_actions[database.profile_name].setChecked(True)
+        
+        for tab_index, table in enumerate(self.tables):
+            table.setModel(self.models[tab_index])
+            if self.models[tab_index] is not None:
+                table.resizeColumnsToContents()
+            self.show_sort_indicator(tab_index)
+        self.show_tab_filter(self.tab_widget.currentIndex())
+        
+        self.database_combo.blockSignals(True)
+        self.database_combo.setCurrentIndex(
+            self.database_combo.findData(self.db_path) if database else -1
+        )
+        self.database_combo.blockSignals(False)
+        
+        # Кнопки доступны, только когда есть текущая база
+        enabled = database is not None
+        self.bt1.setEnabled(enabled)
+        self.bt2.setEnabled(enabled)
+        self.bt3.setEnabled(enabled)
+        self.combo_columns.setEnabled(enabled)
+        self.database_combo.setEnabled(enabled)
+        
+        # Схема базы уже прочитана, проверяется только её версия
+        if enabled:
+            try:
+                self.schema.refresh(self.connection)
+            except sqlite3.Error as e:
+                print(f"Ошибка при обновлении списка колонок: {e}")
+        self.show_columns()
+        self.update_query_status()
+        self.update_cache_status()
+        self.update_profile_status()
+    
+    def database_selected(self, index):
+        database = self.workspace.get(self.database_combo.itemData(index)) if index >= 0 else None
+        if database is not None and database is not self.database:
+            self.activate_database(database)
+    
+    def close_connection(self):
+        """Закрыть текущую базу; текущей становится последняя из открытых"""
+        if self.connection:
+            self.close_database(self.database)
+            if self.workspace.databases:
+                self.activate_database(next(reversed(self.workspace.databases.values())))
             
             QMessageBox.information(
                 self,
@@ -326,6 +533,20 @@ class MainWindow(QMainWindow):
                 "Соединение не установлено!"
             )
     
+    def set_profile(self, name):
+        """Сменить профиль; текущая база переоткрывается с ним сразу"""
+        self.profile_name = name
+        if self.connection:
+            self.open_database(self.db_path)
+        self.update_profile_status()
+    
+    def update_profile_status(self):
+        if self.connection:
+            profile = PROFILES[self.database.profile_name]
+            self.profile_status.setText(f"Профиль: {describe(self.connection, self.db_path, profile)}")
+        else:
+            self.profile_status.setText(f"Профиль: {PROFILES[self.profile_name].title}")
+    
     def execute_query(self, query, tab_index):
         """Выполнить SQL запрос и вывести результат в указанную вкладку"""
         if not self.connection:
@@ -336,74 +557,278 @@ class MainWindow(QMainWindow):
             )
             return
         
-        try:
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
-            
-            # Получаем названия колонок
-            if self.cursor.description:
-                column_names = [description[0] for description in self.cursor.description]
+        # Недочитанные результаты не дали бы записи завершиться
+        reopen = self.close_unfinished() if writes_database(query) else {}
+        # Эту вкладку займёт сам запрос
+        reopen.pop(tab_index, None)
+        
+        # Новый запрос сбрасывает фильтр и сортировку вкладки
+        self.base_queries[tab_index] = query
+        self.filters[tab_index] = ""
+        self.sort_orders[tab_index] = None
+        self.show_query(query, tab_index)
+        if reopen:
+            self.reopen_after[self.models[tab_index]] = (self.database, reopen)
+    
+    def show_query(self, query, tab_index, order=None):
+        """Показать результат запроса во вкладке: из кэша или из потока"""
+        key = QueryResultCache.make_key(query, self.database_version(self.database))
+        cached = self.result_cache.get(key)
+        
+        # Запрос уходит в поток; модель получит первую страницу, когда она
+        # будет готова, остальные - по мере прокрутки
+        model = QueryResultModel(self.runner, self.db_path, query, cached=cached, order=order)
+        model.progress.connect(partial(self.on_query_progress, self.database, model, key, tab_index))
+        model.failed.connect(partial(self.on_query_failed, model, tab_index))
+        self.set_model(tab_index, model)
+        if cached is not None:
+            self.tables[tab_index].resizeColumnsToContents()
+            self.query_log.record(query, 0.0, model.row_count, True, tab_index, "кэш")
+        
+        self.show_sort_indicator(tab_index)
+        
+        # Переключаемся на эту вкладку
+        self.tab_widget.setCurrentIndex(tab_index)
+        self.show_tab_filter(tab_index)
+        self.update_query_status()
+        self.update_cache_status()
+    
+    def update_view(self, tab_index, where, order):
+        """Перезапустить запрос вкладки с новыми фильтром и сортировкой"""
+        query = self.base_queries[tab_index]
+        if query is None or not self.connection:
+            return
+        if where or order is not None:
+            query = view_query(query, where, order)
+            try:
+                # Проверяем, что запрос можно обернуть и условие без ошибок,
+                # не читая ни одной строки
+                self.connection.execute(page_query(query), (0, 0)).fetchall()
+            except sqlite3.Error as e:
+                QMessageBox.warning(
+                    self,
+                    "Предупреждение",
+                    f"Фильтр и сортировка доступны только для SELECT запросов:\n{str(e)}"
+                )
+                self.show_tab_filter(tab_index)
+                return
+        self.filters[tab_index] = where
+        self.sort_orders[tab_index] = order
+        self.show_query(query, tab_index, order)
+    
+    def sort_tab(self, tab_index, column):
+        """Щелчок по заголовку: по возрастанию, по убыванию, без сортировки"""
+        order = self.sort_orders[tab_index]
+        if order is None or order[0] != column:
+            order = (column, False)
+        elif not order[1]:
+            order = (column, True)
+        else:
+            order = None
+        self.update_view(tab_index, self.filters[tab_index], order)
+        # Заголовок сам переключает индикатор при щелчке; показываем тот
+        # порядок, с которым запрос действительно выполнен
+        self.show_sort_indicator(tab_index)
+    
+    def show_sort_indicator(self, tab_index):
+        order = self.sort_orders[tab_index]
+        header = self.tables[tab_index].horizontalHeader()
+        if order is None:
+            header.setSortIndicator(-1, Qt.AscendingOrder)
+        else:
+            header.setSortIndicator(order[0], Qt.DescendingOrder if order[1] else Qt.AscendingOrder)
+    
+    def apply_filter(self):
+        tab_index = self.tab_widget.currentIndex()
+        self.update_view(tab_index, self.filter_edit.text().strip(), self.sort_orders[tab_index])
+    
+    def show_tab_filter(self, tab_index):
+        self.filter_edit.setText(self.filters[tab_index])
+    
+    def database_version(self, database):
+        """Версия базы для ключа кэша.
+        
+        data_version меняется, когда базу изменило другое соединение, а время
+        изменения и размер файла - при любой записи, в том числе своей.
+        Запрос может читать и подключённые базы, поэтому в версию входят
+        время изменения и размер всех открытых файлов.
+        """
+        data_version = database.connection.execute("PRAGMA data_version").fetchone()[0]
+        files = []
+        for path in self.workspace.databases:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                files.append((path, None, None))
+                continue
+            files.append((path, stat.st_mtime_ns, stat.st_size))
+        return data_version, tuple(files)
+    
+    def on_query_progress(self, database, model, key, tab_index, rows, exhausted):
+        if exhausted:
+            self.reopen_closed(model)
+        if not model.logged:
+            # Первая порция: время до неё и попадает в журнал. Результат ровно
+            # в page_size строк приходит второй, пустой порцией - её не пишем
+            model.logged = True
+            self.query_log.record(model.query, model.elapsed(), rows, exhausted, tab_index, "база")
+        if exhausted and self.workspace.get(database.path) is database:
+            # В кэш попадает только целиком прочитанный результат, и только
+            # если база не изменилась, пока он читался
+            all_rows = model.all_rows()
+            if model.columns and all_rows is not None and key[1] == self.database_version(database):
+                database.result_cache.put(key, model.columns, all_rows)
+            # Запрос мог создать или удалить таблицу; схема другой базы
+            # проверится, когда она станет текущей
+            if database is self.database:
+                self.update_columns_combo()
+        if model in self.models:
+            table = self.tables[self.models.index(model)]
+            if rows <= model.page_size:
+                # Автоматическая подгонка ширины колонок по первой странице
+                table.resizeColumnsToContents()
             else:
-                column_names = []
-            
-            # Заполняем таблицу
-            table = self.tables[tab_index]
-            table.clear()
-            table.setRowCount(len(results))
-            table.setColumnCount(len(column_names))
-            table.setHorizontalHeaderLabels(column_names)
-            
-            for row_idx, row_data in enumerate(results):
-                for col_idx, cell_data in enumerate(row_data):
-                    item = QTableWidgetItem(str(cell_data) if cell_data is not None else "")
-                    table.setItem(row_idx, col_idx, item)
-            
-            # Автоматическая подгонка ширины колонок
-            table.resizeColumnsToContents()
-            
-            # Переключаемся на эту вкладку
-            self.tab_widget.setCurrentIndex(tab_index)
-            
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Ошибка SQL",
-                f"Ошибка выполнения запроса:\n{str(e)}"
+                # Дальше колонки только расширяются под видимые строки, чтобы
+                # таблица не прыгала при прокрутке
+                for column in range(model.columnCount()):
+                    width = max(table.columnWidth(column), table.sizeHintForColumn(column))
+                    table.setColumnWidth(column, width)
+        self.update_query_status()
+    
+    def on_query_failed(self, model, tab_index, message):
+        self.query_log.record(model.query, model.elapsed(), model.row_count, False, tab_index, "ошибка")
+        self.reopen_closed(model)
+        self.update_query_status()
+        QMessageBox.critical(
+            self,
+            "Ошибка SQL",
+            f"Ошибка выполнения запроса:\n{message}"
+        )
+    
+    def update_query_status(self):
+        """Показать состояние запроса текущей вкладки в строке состояния"""
+        model = self.models[self.tab_widget.currentIndex()]
+        # Cancel прерывает запрос потока, к какой бы базе он ни относился
+        running = any(
+            model is not None and model.pending
+            for database in self.workspace.databases.values()
+            for model in database.models
+        )
+        self.cancel_button.setEnabled(running)
+        if running:
+            self.status_timer.start()
+        else:
+            self.status_timer.stop()
+        
+        if model is None:
+            self.query_status.clear()
+        elif model.pending:
+            self.query_status.setText(
+                f"Выполняется: {model.elapsed():.1f} с, строк получено: {model.row_count}"
+            )
+        else:
+            more = "" if model.exhausted else " (остальные загрузятся при прокрутке)"
+            self.query_status.setText(
+                f"Готово за {model.elapsed():.2f} с, строк: {model.row_count}{more}"
             )
     
+    def update_cache_status(self):
+        cache = self.result_cache
+        self.cache_status.setText(
+            f"Кэш: попаданий {cache.hits} из {cache.hits + cache.misses} "
+            f"({cache.hit_rate():.0%}), строк в кэше: {cache.rows}"
+        )
+    
+    def set_model(self, tab_index, model):
+        """Показать модель во вкладке, закрыв курсор предыдущей"""
+        old_model = self.models[tab_index]
+        self.tables[tab_index].setModel(model)
+        self.models[tab_index] = model
+        if old_model is not None:
+            old_model.close()
+            old_model.deleteLater()
+            # Запись заменили новым запросом, не дождавшись её: закрытые
+            # ради неё результаты перезапускаются сразу, в поток они уйдут
+            # после записи. При очистке вкладок (model=None) они не нужны
+            pending = self.reopen_after.pop(old_model, None)
+            if pending is not None and model is not None:
+                self.reopen_results(*pending)
+    
+    def close_unfinished(self):
+        """Закрыть недочитанные результаты вкладок текущей базы.
+        
+        Курсор каждого держит блокировку чтения файла, и запись в базу
+        (INSERT, UPDATE, CREATE INDEX...) ждала бы их до ошибки «database is
+        locked». Закрытие уходит в поток раньше записи. Возвращает
+        {вкладка: (запрос, сортировка)} для reopen_results.
+        """
+        reopen = {}
+        for index, model in enumerate(self.models):
+            if model is None or model.exhausted:
+                continue
+            # Ещё не завершённая запись: её закрытые результаты тоже ждут
+            pending = self.reopen_after.pop(model, None)
+            if pending is not None:
+                reopen.update(pending[1])
+            reopen[index] = (model.query, model.order)
+            self.set_model(index, None)
+        return reopen
+    
+    def reopen_closed(self, model):
+        """Запись завершилась: перезапустить закрытые на её время результаты"""
+        pending = self.reopen_after.pop(model, None)
+        if pending is not None:
+            self.reopen_results(*pending)
+    
+    def reopen_results(self, database, reopen):
+        """Заново выполнить запросы вкладок, закрытые close_unfinished"""
+        # Пока шла запись, базу могли закрыть или сменить
+        if self.workspace.get(database.path) is not database:
+            return False
+        if database is not self.database:
+            self.activate_database(database)
+        current = self.tab_widget.currentIndex()
+        for index, (query, order) in reopen.items():
+            if self.models[index] is None:
+                self.show_query(query, index, order)
+        self.tab_widget.setCurrentIndex(current)
+        return True
+    
+    def clear_tables(self):
+        for tab_index in range(len(self.tables)):
+            self.set_model(tab_index, None)
+            self.base_queries[tab_index] = None
+            self.filters[tab_index] = ""
+            self.sort_orders[tab_index] = None
+            self.show_sort_indicator(tab_index)
+        self.show_tab_filter(self.tab_widget.currentIndex())
+    
     def select_column_query(self):
         """Кнопка bt1 - SELECT name FROM sqlite_master"""
         self.execute_query("SELECT name FROM sqlite_master", 1)
     
     def update_columns_combo(self):
-        """Обновить список колонок в ComboBox"""
+        """Обновить список колонок в ComboBox, если схема базы изменилась"""
         try:
-            # Получаем список таблиц
-            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = self.cursor.fetchall()
-            
-            self.combo_columns.clear()
-            self.combo_columns.addItem("Columns")
-            
-            # Для каждой таблицы получаем колонки
-            for table_name in tables:
-                table_name = table_name[0]
-                self.cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = self.cursor.fetchall()
-                
-                for column in columns:
-                    column_name = column[1]  # Имя колонки
-                    self.combo_columns.addItem(f"{table_name}.{column_name}")
-            
+            if self.schema.refresh(self.connection):
+                self.show_columns()
         except Exception as e:
             print(f"Ошибка при обновлении списка колонок: {e}")
     
+    def show_columns(self):
+        """Показать в ComboBox колонки из уже прочитанной схемы"""
+        # Весь список уходит в модель одним вызовом
+        self.combo_columns.blockSignals(True)
+        self.columns_model.setStringList(["Columns"] + self.schema.qualified_columns())
+        self.combo_columns.setCurrentIndex(0)
+        self.combo_columns.blockSignals(False)
+    
     def column_selected(self, index):
         """Обработчик выбора колонки из ComboBox"""
         if index <= 0:  # Пропускаем "Columns"
             return
         
-        selected = self.combo_columns.currentText()
+        selected = self.combo_columns.itemText(index)
         
         if '.' in selected:
             table_name, column_name = selected.split('.')
@@ -414,11 +839,11 @@ class MainWindow(QMainWindow):
         """Кнопка bt2 - Query2"""
         # Получаем список всех таблиц и выводим первую из них
         try:
-            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = self.cursor.fetchall()
+            self.update_columns_combo()
+            tables = self.schema.table_names()
             
             if tables:
-                first_table = tables[0][0]
+                first_table = tables[0]
                 query = f"SELECT * FROM {first_table}"
                 self.execute_query(query, 3)
             else:
@@ -438,16 +863,16 @@ class MainWindow(QMainWindow):
         """Кнопка bt3 - Query3"""
         # Получаем список всех таблиц
         try:
-            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = self.cursor.fetchall()
+            self.update_columns_combo()
+            tables = self.schema.table_names()
             
             if len(tables) > 1:
-                second_table = tables[1][0]
+                second_table = tables[1]
                 query = f"SELECT * FROM {second_table}"
                 self.execute_query(query, 4)
             elif len(tables) == 1:
                 # Если только одна таблица, показываем ее снова
-                first_table = tables[0][0]
+                first_table = tables[0]
                 query = f"SELECT * FROM {first_table} LIMIT 10"
                 self.execute_query(query, 4)
             else:
@@ -463,6 +888,79 @@ class MainWindow(QMainWindow):
                 f"Ошибка выполнения Query3:\n{str(e)}"
             )
     
+    def show_query_log(self):
+        dialog = QueryLogDialog(self.query_log, self)
+        dialog.explain_requested.connect(self.show_explain)
+        dialog.exec_()
+        dialog.deleteLater()
+    
+    def explain_current_query(self):
+        tab_index = self.tab_widget.currentIndex()
+        model = self.models[tab_index]
+        if not self.connection or model is None:
+            QMessageBox.warning(
+                self,
+                "Предупреждение",
+                "В текущей вкладке нет запроса!"
+            )
+            return
+        self.show_explain(model.query, tab_index)
+    
+    def show_explain(self, query, tab_index):
+        """План запроса с подсказками индексов"""
+        if not self.connection:
+            return
+        dialog = ExplainDialog(self.connection, self.schema, self.query_log, query, tab_index, self)
+        dialog.index_requested.connect(self.apply_index)
+        dialog.exec_()
+        dialog.deleteLater()
+    
+    def apply_index(self, index_sql, query, tab_index):
+        """Создать индекс и повторить запрос во вкладке, чтобы сравнить время.
+        
+        CREATE INDEX выполняется в потоке запросов, окно на большой таблице
+        не замирает. Недочитанные результаты на это время закрываются
+        (close_unfinished) и после создания индекса запускаются заново.
+        """
+        model = self.models[tab_index]
+        if model is not None and model.query == query and model.request_id is not None:
+            # Прерываем только запрос, план которого смотрели; остальные
+            # запросы потока дойдут до конца порции
+            self.runner.cancel_request(model.request_id)
+        reopen = self.close_unfinished()
+        
+        index_model = QueryResultModel(self.runner, self.db_path, index_sql, parent=self)
+        index_model.progress.connect(
+            partial(self.on_index_created, self.database, index_model, reopen, query, tab_index)
+        )
+        index_model.failed.connect(
+            partial(self.on_index_failed, self.database, index_model, reopen, query, tab_index)
+        )
+    
+    def on_index_created(self, database, index_model, reopen, query, tab_index, rows, exhausted):
+        if not exhausted:
+            return
+        index_model.close()
+        index_model.deleteLater()
+        if not self.reopen_results(database, reopen):
+            return
+        
+        model = self.models[tab_index]
+        if model is None or model.query != query:
+            self.execute_query(query, tab_index)
+        elif tab_index not in reopen:
+            self.show_query(query, tab_index, model.order)
+        self.tab_widget.setCurrentIndex(tab_index)
+    
+    def on_index_failed(self, database, index_model, reopen, query, tab_index, message):
+        QMessageBox.critical(
+            self,
+            "Ошибка",
+            f"Не удалось создать индекс:\n{message}"
+        )
+        # Закрытые результаты всё равно открываются заново
+        self.on_index_created(database, index_model, reopen, query, tab_index, 0, True)
+    
     def show_custom_query_dialog(self):
         """Показать модальное окно для ввода пользовательского запроса (БОНУС)"""
         if not self.connection:
@@ -480,10 +978,91 @@ class MainWindow(QMainWindow):
                 # Определяем, в какую вкладку выводить (используем Tab2)
                 self.execute_query(query, 1)
     
+    def export_results(self):
+        """Выгрузить результат текущей вкладки в CSV или колоночный файл"""
+        model = self.models[self.tab_widget.currentIndex()]
+        # Запрос вкладки может ещё выполняться: выгрузка запустит его сама
+        if not self.connection or model is None or (model.exhausted and not model.columns):
+            QMessageBox.warning(
+                self,
+                "Предупреждение",
+                "В текущей вкладке нет результата запроса!"
+            )
+            return
+        if self.export_progress is not None:
+            QMessageBox.warning(
+                self,
+                "Предупреждение",
+                "Предыдущая выгрузка ещё не закончена!"
+            )
+            return
+        
+        columnar_filter = f"Колоночный файл (*{COLUMNAR_EXTENSION})"
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Экспорт результата",
+            "",
+            f"CSV (*.csv);;{columnar_filter}"
+        )
+        if not file_path:
+            return
+        
+        if file_path.endswith(COLUMNAR_EXTENSION) or selected_filter == columnar_filter:
+            file_format = 'columnar'
+            if not file_path.endswith(COLUMNAR_EXTENSION):
+                file_path += COLUMNAR_EXTENSION
+        else:
+            file_format = 'csv'
+            if not file_path.endswith('.csv'):
+                file_path += '.csv'
+        
+        # Запрос выполняется заново и читается с курсора порциями, так что
+        # выгружается весь результат, а не только загруженные страницы
+        self.export_progress = QProgressDialog("Экспорт...", "Cancel", 0, 0, self)
+        self.export_progress.setWindowTitle("Экспорт результата")
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.canceled.connect(self.exporter.cancel)
+        self.export_progress.show()
+        self.exporter.export(
+            self.db_path, model.query, file_path, file_format,
+            self.workspace.attachments(self.db_path)
+        )
+    
+    def on_export_progress(self, rows):
+        if self.export_progress is not None:
+            self.export_progress.setLabelText(f"Записано строк: {rows}")
+    
+    def close_export_progress(self):
+        if self.export_progress is not None:
+            self.export_progress.canceled.disconnect(self.exporter.cancel)
+            self.export_progress.close()
+            self.export_progress.deleteLater()
+            self.export_progress = None
+    
+    def on_export_finished(self, file_path, rows, seconds):
+        self.close_export_progress()
+        QMessageBox.information(
+            self,
+            "Экспорт",
+            f"Выгружено строк: {rows} за {seconds:.1f} с\n{file_path}"
+        )
+    
+    def on_export_failed(self, message):
+        self.close_export_progress()
+        QMessageBox.critical(
+            self,
+            "Ошибка",
+            f"Ошибка экспорта:\n{message}"
+        )
+    
     def closeEvent(self, event):
         """Обработчик закрытия приложения"""
-        if self.connection:
-            self.connection.close()
+        # Прерываем долгий запрос, иначе поток придётся ждать до его конца
+        self.runner.cancel()
+        for database in list(self.workspace.databases.values()):
+            self.close_database(database)
+        self.runner.shutdown()
+        self.exporter.shutdown()
         event.accept()
 
 
@@ -0,0 +1,130 @@
+"""Замер влияния профилей соединения LAB3 на запросы с полным просмотром.
+
+Для самой большой таблицы базы (или указанной в --table) выполняются
+запросы, которые читают её целиком: подсчёт строк, чтение всех колонок
+каждой строки и DISTINCT по колонке без индекса (временное дерево).
+Каждый профиль из connection_profiles открывает своё соединение, первый
+прогон запроса не учитывается (прогрев), из остальных берутся лучшее и
+медианное время. Отчёт пишется в JSON, его можно сравнить с предыдущим:
+
+    python profile_benchmark.py big.db --output before.json
+    python profile_benchmark.py big.db --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+from time import perf_counter
+from connection_profiles import PROFILES, connect, effective_profile, is_wal
+from query_worker import quote_identifier
+from schema_index import SchemaIndex
+
+
+def largest_table(connection, schema):
+    def size(table):
+        try:
+            return connection.execute(f"SELECT max(rowid) FROM {quote_identifier(table)}").fetchone()[0] or 0
+        except sqlite3.Error:
+            # WITHOUT ROWID
+            return 0
+    return max(schema.tables, key=size)
+
+
+def scan_queries(schema, table):
+    columns = schema.tables[table]
+    name = quote_identifier(table)
+    row_size = " + ".join(f"length({quote_identifier(column.name)})" for column in columns)
+    queries = {
+        'count': f"SELECT count(*) FROM {name}",
+        'all_columns': f"SELECT sum({row_size}) FROM {name}",
+    }
+    indexed = schema.indexed_columns(table)
+    plain = [column.name for column in columns if column.name not in indexed]
+    if plain:
+        column = quote_identifier(plain[0])
+        queries['distinct'] = f"SELECT count(*) FROM (SELECT DISTINCT {column} FROM {name})"
+    return queries
+
+
+def measure(db_path, profile, queries, repeat):
+    connection = connect(db_path, profile)
+    results = {}
+    try:
+        for label, query in queries.items():
+            times = []
+            for _ in range(repeat + 1):
+                started = perf_counter()
+                connection.execute(query).fetchall()
+                times.append(perf_counter() - started)
+            times = times[1:]
+            results[label] = {'best': min(times), 'median': statistics.median(times)}
+    finally:
+        connection.close()
+    return results
+
+
+def print_report(report, previous=None):
+    labels = list(next(iter(report['profiles'].values())))
+    print(f"{'профиль':<12}" + "".join(f"{label:>16}" for label in labels))
+    for name, results in report['profiles'].items():
+        cells = []
+        for label in labels:
+            cell = f"{results[label]['median'] * 1000:.1f} мс"
+            old = previous and previous['profiles'].get(name, {}).get(label)
+            if old:
+                cell += f" ({results[label]['median'] / old['median']:.2f}x)"
+            cells.append(f"{cell:>16}")
+        print(f"{name:<12}" + "".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('database', help='файл базы SQLite')
+    parser.add_argument('--table', help='таблица для замера (по умолчанию самая большая)')
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument('--repeat', type=int, default=3, help='прогонов каждого запроса')
+    parser.add_argument('--output', default='profiles.json', help='куда записать отчёт')
+    parser.add_argument('--compare', help='отчёт предыдущего запуска для сравнения')
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat должен быть больше нуля")
+
+    with sqlite3.connect(args.database) as connection:
+        schema = SchemaIndex()
+        schema.refresh(connection)
+        if not schema.tables:
+            parser.error(f"в базе {args.database} нет таблиц")
+        if args.table and args.table not in schema.tables:
+            parser.error(f"в базе нет таблицы {args.table}")
+        table = args.table or largest_table(connection, schema)
+    queries = scan_queries(schema, table)
+
+    report = {
+        'database': args.database,
+        'table': table,
+        'wal': is_wal(args.database),
+        'sqlite': sqlite3.sqlite_version,
+        'python': platform.python_version(),
+        'queries': queries,
+        'profiles': {},
+    }
+    for name in args.profiles:
+        profile = PROFILES[name]
+        if effective_profile(args.database, profile) != profile:
+            print(f"{name}: база в режиме WAL, immutable не используется")
+        report['profiles'][name] = measure(args.database, profile, queries, args.repeat)
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            previous = json.load(file)
+    print(f"Таблица {table}, медиана из {args.repeat} прогонов")
+    print_report(report, previous)
+
+
+if __name__ == '__main__':
+    main()
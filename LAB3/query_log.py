@@ -0,0 +1,57 @@
+import datetime
+from collections import deque, namedtuple
+from PyQt5.QtCore import QObject, pyqtSignal
+
+SLOW_QUERY_SECONDS = 0.5
+SLOW_LOG_PATH = 'slow_queries.log'
+
+# seconds - время до первой страницы; complete - результат прочитан целиком;
+# source - «база», «кэш» или «ошибка»
+LogEntry = namedtuple('LogEntry', 'started sql seconds rows complete tab source')
+
+
+class QueryLog(QObject):
+    """Журнал запросов окна: последние max_entries запросов в памяти,
+    медленные (от threshold секунд) ещё и дописываются в файл path"""
+
+    recorded = pyqtSignal(object)
+
+    def __init__(self, threshold=SLOW_QUERY_SECONDS, path=SLOW_LOG_PATH,
+                 max_entries=500, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold
+        self.path = path
+        self.entries = deque(maxlen=max_entries)
+
+    def record(self, sql, seconds, rows, complete, tab, source):
+        entry = LogEntry(datetime.datetime.now(), sql, seconds, rows, complete, tab, source)
+        self.entries.append(entry)
+        if self.is_slow(entry):
+            self.write(entry)
+        self.recorded.emit(entry)
+        return entry
+
+    def is_slow(self, entry):
+        return entry.seconds >= self.threshold
+
+    def slow_entries(self):
+        return [entry for entry in self.entries if self.is_slow(entry)]
+
+    def last(self, sql):
+        """Последняя запись о запросе или None"""
+        for entry in reversed(self.entries):
+            if entry.sql == sql:
+                return entry
+        return None
+
+    def write(self, entry):
+        rows = f"{entry.rows}" if entry.complete else f"{entry.rows}+"
+        line = (
+            f"{entry.started:%Y-%m-%d %H:%M:%S}\t{entry.seconds:.3f} с\tстрок: {rows}\t"
+            f"Tab{entry.tab + 1}\t{entry.source}\t{' '.join(entry.sql.split())}\n"
+        )
+        try:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line)
+        except OSError as e:
+            print(f"Не удалось записать журнал медленных запросов: {e}")
@@ -0,0 +1,335 @@
+import re
+import sqlite3
+from collections import namedtuple
+from PyQt5.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QCheckBox,
+    QTreeWidget,
+    QTreeWidgetItem,
+    QListWidget,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QAbstractItemView,
+)
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import pyqtSignal
+from query_worker import page_query, quote_identifier
+
+PlanStep = namedtuple('PlanStep', 'id parent detail')
+IndexSuggestion = namedtuple('IndexSuggestion', 'table column sql')
+
+FULL_SCAN_COLOR = QColor('#f5b7b1')
+TEMP_TREE_COLOR = QColor('#fcf3cf')
+SLOW_COLOR = QColor('#fadbd8')
+
+# «SCAN g» без USING INDEX - полный просмотр таблицы (или её псевдонима)
+FULL_SCAN = re.compile(r'^SCAN (\S+)$')
+STRING = re.compile(r"'(?:[^']|'')*'")
+IDENTIFIER = r'(?:"(?:[^"]|"")+"|\[[^\]]+\]|`[^`]+`|[A-Za-z_]\w*)'
+TABLE_REF = re.compile(rf'\b(?:FROM|JOIN)\s+({IDENTIFIER})(?:\s+(?:AS\s+)?({IDENTIFIER}))?', re.I)
+COLUMN_REF = re.compile(rf'(?:({IDENTIFIER})\s*\.\s*)?({IDENTIFIER})')
+CLAUSE = re.compile(r'\b(WHERE|ON|ORDER\s+BY|GROUP\s+BY)\b', re.I)
+CLAUSE_END = re.compile(
+    r'\b(?:SELECT|FROM|WHERE|JOIN|ON|ORDER\s+BY|GROUP\s+BY|HAVING|LIMIT|'
+    r'UNION|EXCEPT|INTERSECT|WINDOW)\b', re.I
+)
+ORDINAL = re.compile(r'^\s*(\d+)(?:\s+(?:ASC|DESC))?\s*$', re.I)
+KEYWORDS = {
+    'where', 'join', 'on', 'left', 'right', 'inner', 'outer', 'cross', 'natural',
+    'full', 'using', 'order', 'group', 'limit', 'having', 'union', 'except',
+    'intersect', 'window', 'and', 'or', 'not', 'in', 'is', 'null', 'like', 'glob',
+    'between', 'asc', 'desc', 'collate', 'case', 'when', 'then', 'else', 'end',
+    'exists', 'by', 'as', 'distinct', 'escape', 'regexp', 'match', 'cast',
+}
+
+
+def unquote(name):
+    if name[0] in '"[`':
+        return name[1:-1].replace('""', '"')
+    return name
+
+
+def explain(connection, sql):
+    """План выполнения запроса: список PlanStep в порядке EXPLAIN QUERY PLAN.
+
+    EXPLAIN не читает базу и сам не замечает, что схему изменило другое
+    соединение (например, индекс создан в потоке запросов). Поэтому сначала
+    чтение sqlite_master перечитывает схему, а её версия входит в текст
+    запроса, чтобы не взять из кэша sqlite3 план, построенный по старой.
+    """
+    connection.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+    version = connection.execute("PRAGMA schema_version").fetchone()[0]
+    rows = connection.execute(f"EXPLAIN QUERY PLAN /* schema {version} */ {sql}").fetchall()
+    return [PlanStep(step_id, parent, detail) for step_id, parent, _, detail in rows]
+
+
+def result_columns(connection, sql):
+    """Названия колонок результата, не читая ни одной строки"""
+    try:
+        return [d[0] for d in connection.execute(page_query(sql), (0, 0)).description]
+    except sqlite3.Error:
+        return []
+
+
+def table_aliases(sql):
+    """Псевдоним или имя таблицы (в нижнем регистре) -> имя таблицы"""
+    aliases = {}
+    for table, alias in TABLE_REF.findall(STRING.sub("''", sql)):
+        table = unquote(table)
+        aliases[table.lower()] = table
+        if alias and alias.lower() not in KEYWORDS:
+            aliases[unquote(alias).lower()] = table
+    return aliases
+
+
+def clause_columns(sql, columns=()):
+    """Колонки из WHERE/ON, затем из ORDER BY/GROUP BY: (уточнение, колонка).
+
+    Номера колонок в ORDER BY заменяются названиями из columns.
+    """
+    sql = STRING.sub("''", sql)
+    filters, orders = [], []
+    for match in CLAUSE.finditer(sql):
+        end = CLAUSE_END.search(sql, match.end())
+        text = sql[match.end():end.start() if end else len(sql)]
+        is_order = match.group(1).upper() not in ('WHERE', 'ON')
+        target = orders if is_order else filters
+        if is_order:
+            for term in text.split(','):
+                ordinal = ORDINAL.match(term)
+                if ordinal and 0 < int(ordinal.group(1)) <= len(columns):
+                    target.append((None, columns[int(ordinal.group(1)) - 1]))
+        for qualifier, name in COLUMN_REF.findall(text):
+            if name.lower() not in KEYWORDS:
+                target.append((unquote(qualifier) if qualifier else None, unquote(name)))
+    return filters + orders
+
+
+def suggest_indexes(sql, plan, schema, columns=()):
+    """Индексы для таблиц, которые план просматривает целиком.
+
+    Эвристика: для каждой такой таблицы берутся её колонки из условий
+    WHERE/ON, затем из ORDER BY/GROUP BY, которые ещё не стоят первыми ни в
+    одном индексе; на каждую предлагается отдельный индекс.
+    """
+    aliases = table_aliases(sql)
+    tables = {name.lower(): name for name in schema.tables}
+    references = clause_columns(sql, columns)
+    suggestions = []
+    for step in plan:
+        scan = FULL_SCAN.match(step.detail)
+        if not scan:
+            continue
+        alias = scan.group(1).lower()
+        table = tables.get(aliases.get(alias, alias).lower())
+        if table is None:
+            continue
+        table_columns = {column.name.lower(): column.name for column in schema.tables[table]}
+        indexed = {name.lower() for name in schema.indexed_columns(table) if name}
+        for qualifier, name in references:
+            if qualifier is not None and qualifier.lower() not in (alias, table.lower()):
+                continue
+            column = table_columns.get(name.lower())
+            if column is None or column.lower() in indexed:
+                continue
+            if any(s.table == table and s.column == column for s in suggestions):
+                continue
+            index_name = quote_identifier(f"idx_{table}_{column}")
+            suggestions.append(IndexSuggestion(table, column, (
+                f"CREATE INDEX IF NOT EXISTS {index_name} "
+                f"ON {quote_identifier(table)}({quote_identifier(column)})"
+            )))
+    return suggestions
+
+
+def format_entry_time(entry):
+    if entry is None:
+        return "ещё не выполнялся"
+    rows = f"{entry.rows}" if entry.complete else f"{entry.rows}+"
+    return f"{entry.seconds:.3f} с до первой страницы, строк: {rows} ({entry.source})"
+
+
+class ExplainDialog(QDialog):
+    """План запроса деревом, подсветка полных просмотров и подсказки индексов"""
+
+    # CREATE INDEX, запрос, вкладка
+    index_requested = pyqtSignal(str, str, int)
+
+    def __init__(self, connection, schema, query_log, sql, tab, parent=None):
+        super().__init__(parent)
+        self.connection = connection
+        self.schema = schema
+        self.sql = sql
+        self.tab = tab
+        self.before = query_log.last(sql)
+        # Индекс создаётся в потоке; план перечитывается, когда запрос повторён
+        self.waiting = False
+        self.setWindowTitle("План запроса")
+        self.resize(700, 500)
+
+        layout = QVBoxLayout(self)
+        query_label = QLabel(sql)
+        query_label.setWordWrap(True)
+        query_label.setStyleSheet("font-family: monospace; padding: 5px;")
+        layout.addWidget(query_label)
+
+        self.time_label = QLabel(f"Время: {format_entry_time(self.before)}")
+        layout.addWidget(self.time_label)
+
+        self.plan_tree = QTreeWidget()
+        self.plan_tree.setHeaderLabels(["Шаг плана"])
+        layout.addWidget(self.plan_tree, 2)
+
+        layout.addWidget(QLabel("Предлагаемые индексы:"))
+        self.suggestion_list = QListWidget()
+        layout.addWidget(self.suggestion_list, 1)
+
+        buttons = QHBoxLayout()
+        self.apply_button = QPushButton("Создать индекс и повторить")
+        self.apply_button.clicked.connect(self.apply_suggestion)
+        buttons.addWidget(self.apply_button)
+        buttons.addStretch()
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        query_log.recorded.connect(self.on_recorded)
+        self.refresh()
+
+    def refresh(self):
+        self.plan_tree.clear()
+        self.suggestion_list.clear()
+        self.suggestions = []
+        try:
+            plan = explain(self.connection, self.sql)
+        except sqlite3.Error as e:
+            QTreeWidgetItem(self.plan_tree, [f"Ошибка: {e}"])
+            self.apply_button.setEnabled(False)
+            return
+
+        self.schema.refresh(self.connection)
+        self.suggestions = suggest_indexes(
+            self.sql, plan, self.schema, result_columns(self.connection, self.sql)
+        )
+        names = self.table_names()
+        full_scans = 0
+        items = {}
+        for step in plan:
+            parent = items.get(step.parent, self.plan_tree)
+            item = QTreeWidgetItem(parent, [step.detail])
+            items[step.id] = item
+            scan = FULL_SCAN.match(step.detail)
+            if scan and scan.group(1).lower() in names:
+                full_scans += 1
+                item.setBackground(0, FULL_SCAN_COLOR)
+                item.setToolTip(0, "Полный просмотр таблицы")
+            elif step.detail.startswith("USE TEMP B-TREE"):
+                item.setBackground(0, TEMP_TREE_COLOR)
+                item.setToolTip(0, "Сортировка во временном дереве")
+        self.plan_tree.expandAll()
+
+        for suggestion in self.suggestions:
+            self.suggestion_list.addItem(suggestion.sql)
+        if not self.suggestions:
+            self.suggestion_list.addItem(
+                "Подходящих колонок в условиях и сортировке нет: индекс не поможет"
+                if full_scans else "Полных просмотров таблиц нет"
+            )
+        else:
+            self.suggestion_list.setCurrentRow(0)
+        self.apply_button.setEnabled(bool(self.suggestions))
+
+    def table_names(self):
+        """Имена таблиц и псевдонимы запроса, которые ссылаются на таблицы"""
+        tables = {name.lower() for name in self.schema.tables}
+        return {alias for alias, table in table_aliases(self.sql).items() if table.lower() in tables}
+
+    def apply_suggestion(self):
+        row = self.suggestion_list.currentRow()
+        if 0 <= row < len(self.suggestions):
+            self.waiting = True
+            self.apply_button.setEnabled(False)
+            self.time_label.setText("Создаётся индекс...")
+            self.index_requested.emit(self.suggestions[row].sql, self.sql, self.tab)
+
+    def on_recorded(self, entry):
+        if entry.sql != self.sql:
+            return
+        if self.waiting:
+            self.waiting = False
+            self.refresh()
+        if self.before is None or self.before is entry:
+            self.time_label.setText(f"Время: {format_entry_time(entry)}")
+        else:
+            self.time_label.setText(
+                f"Было: {format_entry_time(self.before)}\nСтало: {format_entry_time(entry)}"
+            )
+
+
+class QueryLogDialog(QDialog):
+    """Журнал выполненных запросов; медленные подсвечены"""
+
+    # запрос, вкладка
+    explain_requested = pyqtSignal(str, int)
+
+    def __init__(self, query_log, parent=None):
+        super().__init__(parent)
+        self.query_log = query_log
+        self.setWindowTitle("Журнал запросов")
+        self.resize(900, 450)
+
+        layout = QVBoxLayout(self)
+        self.slow_only = QCheckBox(f"Только медленные (от {query_log.threshold} с)")
+        self.slow_only.toggled.connect(self.refresh)
+        layout.addWidget(self.slow_only)
+
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(["Время", "Вкладка", "Секунд", "Строк", "Источник", "Запрос"])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(5, QHeaderView.Stretch)
+        self.table.doubleClicked.connect(self.explain_selected)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        explain_button = QPushButton("Explain")
+        explain_button.clicked.connect(self.explain_selected)
+        buttons.addWidget(explain_button)
+        buttons.addStretch()
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        query_log.recorded.connect(self.refresh)
+        self.refresh()
+
+    def refresh(self):
+        entries = self.query_log.slow_entries() if self.slow_only.isChecked() else list(self.query_log.entries)
+        self.entries = entries[::-1]
+        self.table.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries):
+            rows = f"{entry.rows}" if entry.complete else f"{entry.rows}+"
+            values = [
+                f"{entry.started:%H:%M:%S}", f"Tab{entry.tab + 1}", f"{entry.seconds:.3f}",
+                rows, entry.source, " ".join(entry.sql.split()),
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if self.query_log.is_slow(entry):
+                    item.setBackground(SLOW_COLOR)
+                self.table.setItem(row, column, item)
+        self.table.resizeColumnsToContents()
+
+    def explain_selected(self):
+        row = self.table.currentRow()
+        if 0 <= row < len(self.entries):
+            entry = self.entries[row]
+            self.explain_requested.emit(entry.sql, entry.tab)
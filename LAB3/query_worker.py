@@ -0,0 +1,313 @@
+import re
+import sqlite3
+from contextlib import contextmanager
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from connection_profiles import PROFILES, DEFAULT_PROFILE
+from workspace import ConnectionPool, other_databases, sync_attachments
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+READ_STATEMENT = re.compile(r'\s*(?:SELECT|VALUES|EXPLAIN)\b', re.I)
+WITH_STATEMENT = re.compile(r'\s*WITH\b', re.I)
+PRAGMA_STATEMENT = re.compile(r'\s*PRAGMA\b', re.I)
+WRITE_KEYWORD = re.compile(r'\b(?:INSERT|UPDATE|DELETE|REPLACE)\b', re.I)
+
+
+def writes_database(query):
+    """Может ли запрос изменить базу.
+
+    Точно неизвестно, пока запрос не подготовлен, поэтому всё, что не
+    похоже на чтение, считается записью: лишний раз закрытые результаты
+    просто перечитываются.
+    """
+    if READ_STATEMENT.match(query):
+        return False
+    if WITH_STATEMENT.match(query):
+        return bool(WRITE_KEYWORD.search(query))
+    if PRAGMA_STATEMENT.match(query):
+        # PRAGMA table_info(t) читает, PRAGMA user_version = 1 пишет
+        return '=' in query
+    return True
+
+
+def view_query(query, where=None, order=None):
+    """Исходный запрос с фильтром и сортировкой, которые выполнит база.
+
+    order - (номер колонки с нуля, по убыванию). SQLite разворачивает
+    подзапрос, поэтому сортировка по индексированной колонке таблицы идёт
+    по индексу и первая страница не ждёт сортировки всего результата.
+    """
+    query = f"SELECT * FROM ({query.strip().rstrip(';')})"
+    if where:
+        query += f" WHERE {where}"
+    if order is not None:
+        column, descending = order
+        query += f" ORDER BY {column + 1}" + (" DESC" if descending else "")
+    return query
+
+
+def page_query(query, seek=None):
+    """Запрос одной страницы результата через подзапрос.
+
+    Без seek страница ищется по LIMIT/OFFSET. seek - (колонка, по убыванию):
+    тогда запрос начинается со значения сортируемой колонки в первой строке
+    страницы, и база находит его по индексу, а не отсчитывает OFFSET строк
+    с начала; OFFSET пропускает только строки с тем же значением.
+    """
+    query = f"SELECT * FROM ({query.strip().rstrip(';')})"
+    if seek is None:
+        return query + " LIMIT ? OFFSET ?"
+    column, descending = seek
+    column = quote_identifier(column)
+    operator, direction = ("<=", "DESC") if descending else (">=", "ASC")
+    return (
+        f"{query} WHERE {column} {operator} ? "
+        f"ORDER BY {column} {direction} LIMIT ? OFFSET ?"
+    )
+
+
+class QueryWorker(QObject):
+    """Выполнение запросов в отдельном потоке со своими соединениями sqlite3.
+
+    Живёт в потоке QueryRunner, слоты вызываются через очередь сигналов.
+    Курсоры открытых результатов хранятся по номеру запроса: следующая
+    порция строк читается только тогда, когда её попросит модель.
+
+    У каждого результата своё соединение. Connection.interrupt() прерывает
+    все незавершённые запросы соединения, включая новые, пока не закончатся
+    старые, поэтому на общем соединении отмена одного запроса ломала бы
+    чтение результатов в остальных вкладках.
+
+    Соединения берутся из пула своего файла и возвращаются в него, когда
+    модель закрывает результат, так что новый запрос к уже открытой базе
+    не открывает файл и не читает схему заново. Остальные открытые базы
+    подключены к соединению через ATTACH под своими именами.
+    """
+
+    # номер запроса, названия колонок, можно ли перечитывать страницы
+    started = pyqtSignal(int, list, bool)
+    # номер запроса, строки, результат дочитан до конца
+    rows_ready = pyqtSignal(int, list, bool)
+    # номер запроса, номер страницы, строки
+    page_ready = pyqtSignal(int, int, list)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self):
+        super().__init__()
+        # Путь к файлу -> пул его соединений и имя базы для ATTACH
+        self.pools = {}
+        self.aliases = {}
+        self.connections = {}
+        self.request_paths = {}
+        self.cursors = {}
+        self.queries = {}
+        # Соединение, на котором сейчас выполняется запрос, и номер запроса;
+        # соединение прерывает cancel
+        self.active_connection = None
+        self.active_request = None
+
+    @pyqtSlot(str, str, str)
+    def open_database(self, db_path, alias, profile_name):
+        self.close_database(db_path)
+        self.pools[db_path] = ConnectionPool(db_path, PROFILES[profile_name])
+        self.aliases[db_path] = alias
+
+    @pyqtSlot(str)
+    def close_database(self, db_path):
+        for request_id, path in list(self.request_paths.items()):
+            if path == db_path:
+                self.forget_query(request_id)
+        self.aliases.pop(db_path, None)
+        pool = self.pools.pop(db_path, None)
+        if pool is not None:
+            pool.close()
+
+    @pyqtSlot()
+    def close_all(self):
+        for db_path in list(self.pools):
+            self.close_database(db_path)
+
+    @contextmanager
+    def active(self, request_id, connection):
+        self.active_request = request_id
+        self.active_connection = connection
+        try:
+            yield connection
+        finally:
+            self.active_connection = None
+            self.active_request = None
+
+    @pyqtSlot(int, str, str, int)
+    def execute(self, request_id, db_path, query, batch_size):
+        pool = self.pools.get(db_path)
+        if pool is None:
+            self.failed.emit(request_id, "соединение не установлено")
+            return
+        try:
+            connection = pool.acquire()
+        except sqlite3.Error as e:
+            self.failed.emit(request_id, str(e))
+            return
+        self.connections[request_id] = connection
+        self.request_paths[request_id] = db_path
+        try:
+            sync_attachments(connection, other_databases(self.aliases, db_path))
+            with self.active(request_id, connection):
+                cursor = connection.cursor()
+                cursor.execute(query)
+            if not cursor.description:
+                # Запрос без результата (INSERT, CREATE...): фиксируем изменения
+                connection.commit()
+                self.forget_query(request_id)
+                self.started.emit(request_id, [], False)
+                self.rows_ready.emit(request_id, [], True)
+                return
+
+            columns = [description[0] for description in cursor.description]
+            self.cursors[request_id] = cursor
+            self.queries[request_id] = query
+            self.started.emit(request_id, columns, self.can_reload(connection, query))
+        except sqlite3.Error as e:
+            self.forget_query(request_id)
+            self.failed.emit(request_id, str(e))
+            return
+        self.fetch(request_id, batch_size)
+
+    def can_reload(self, connection, query):
+        try:
+            connection.execute(page_query(query), (0, 0)).fetchall()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @pyqtSlot(int, int)
+    def fetch(self, request_id, batch_size):
+        cursor = self.cursors.get(request_id)
+        if cursor is None:
+            return
+        try:
+            with self.active(request_id, self.connections[request_id]):
+                rows = cursor.fetchmany(batch_size)
+        except sqlite3.Error as e:
+            self.forget_query(request_id)
+            self.failed.emit(request_id, str(e))
+            return
+        exhausted = len(rows) < batch_size
+        if exhausted:
+            self.close_query(request_id)
+        self.rows_ready.emit(request_id, rows, exhausted)
+
+    @pyqtSlot(int, int, int, object)
+    def reload_page(self, request_id, page, page_size, seek):
+        """Перечитать страницу; seek - (колонка, по убыванию, значение, пропуск)
+        для поиска по значению сортируемой колонки или None"""
+        query = self.queries.get(request_id)
+        if query is None:
+            return
+        if seek is None:
+            sql = page_query(query)
+            params = (page_size, page * page_size)
+        else:
+            column, descending, key, skip = seek
+            sql = page_query(query, (column, descending))
+            params = (key, page_size, skip)
+        try:
+            with self.active(request_id, self.connections[request_id]) as connection:
+                rows = connection.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            self.failed.emit(request_id, str(e))
+            return
+        self.page_ready.emit(request_id, page, rows)
+
+    @pyqtSlot(int)
+    def close_query(self, request_id):
+        """Результат дочитан: курсор больше не нужен, соединение - для страниц"""
+        cursor = self.cursors.pop(request_id, None)
+        if cursor is not None:
+            cursor.close()
+
+    @pyqtSlot(int)
+    def forget_query(self, request_id):
+        """Модель закрыта: страницы этого запроса больше не понадобятся"""
+        self.close_query(request_id)
+        self.queries.pop(request_id, None)
+        connection = self.connections.pop(request_id, None)
+        pool = self.pools.get(self.request_paths.pop(request_id, None))
+        if connection is None:
+            return
+        if pool is None:
+            # База уже закрыта
+            connection.close()
+            return
+        try:
+            pool.release(connection)
+        except sqlite3.Error:
+            connection.close()
+
+
+class QueryRunner(QObject):
+    """Поток с QueryWorker и методы для обращения к нему из окна"""
+
+    open_requested = pyqtSignal(str, str, str)
+    close_requested = pyqtSignal(str)
+    close_all_requested = pyqtSignal()
+    execute_requested = pyqtSignal(int, str, str, int)
+    fetch_requested = pyqtSignal(int, int)
+    reload_requested = pyqtSignal(int, int, int, object)
+    forget_requested = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.next_request_id = 0
+        self.thread = QThread(self)
+        self.worker = QueryWorker()
+        self.worker.moveToThread(self.thread)
+
+        self.open_requested.connect(self.worker.open_database)
+        self.close_requested.connect(self.worker.close_database)
+        self.close_all_requested.connect(self.worker.close_all)
+        self.execute_requested.connect(self.worker.execute)
+        self.fetch_requested.connect(self.worker.fetch)
+        self.reload_requested.connect(self.worker.reload_page)
+        self.forget_requested.connect(self.worker.forget_query)
+        self.thread.finished.connect(self.worker.deleteLater)
+        self.thread.start()
+
+    def open_database(self, db_path, alias, profile_name=DEFAULT_PROFILE):
+        self.open_requested.emit(db_path, alias, profile_name)
+
+    def close_database(self, db_path):
+        self.close_requested.emit(db_path)
+
+    def execute(self, db_path, query, batch_size):
+        """Поставить запрос к базе db_path в очередь; возвращает его номер"""
+        self.next_request_id += 1
+        self.execute_requested.emit(self.next_request_id, db_path, query, batch_size)
+        return self.next_request_id
+
+    def cancel(self):
+        """Прервать то, что сейчас выполняет поток.
+
+        Connection.interrupt() можно вызывать из другого потока: выполняемый
+        запрос завершится с ошибкой «interrupted».
+        """
+        connection = self.worker.active_connection
+        if connection is not None:
+            try:
+                connection.interrupt()
+            except sqlite3.ProgrammingError:
+                # Соединение успели закрыть: прерывать уже нечего
+                pass
+
+    def cancel_request(self, request_id):
+        """Прервать запрос request_id, если поток выполняет именно его"""
+        if self.worker.active_request == request_id:
+            self.cancel()
+
+    def shutdown(self):
+        self.close_all_requested.emit()
+        self.thread.quit()
+        self.thread.wait()
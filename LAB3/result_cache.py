@@ -0,0 +1,65 @@
+import re
+from collections import OrderedDict
+
+# Строки в кавычках и идентификаторы в двойных кавычках нормализация не трогает
+QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+
+def normalize_sql(query):
+    """SQL без лишних пробелов и завершающей точки с запятой"""
+    parts = QUOTED.split(query.strip().rstrip(';').strip())
+    for i in range(0, len(parts), 2):
+        parts[i] = ' '.join(parts[i].split())
+    return ''.join(parts)
+
+
+class QueryResultCache:
+    """LRU-кэш небольших результатов запросов.
+
+    Ключ - нормализованный текст запроса и версия базы (PRAGMA data_version
+    и время изменения файла), поэтому после любой записи в базу, в том числе
+    из другой программы, старые результаты просто перестают находиться.
+    Общее число строк в кэше ограничено max_rows, результаты больше
+    max_entry_rows не кэшируются.
+    """
+
+    def __init__(self, max_rows=200000, max_entry_rows=20000):
+        self.max_rows = max_rows
+        self.max_entry_rows = max_entry_rows
+        self.entries = OrderedDict()
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query, version):
+        return normalize_sql(query), version
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, columns, rows):
+        if len(rows) > self.max_entry_rows:
+            return
+        # Результаты прошлых версий базы уже никогда не найдутся
+        for stale in [old_key for old_key in self.entries if old_key[1] != key[1] or old_key == key]:
+            self.rows -= len(self.entries.pop(stale)[1])
+        self.entries[key] = (columns, rows)
+        self.rows += len(rows)
+        while self.rows > self.max_rows:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.rows -= len(evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.rows = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
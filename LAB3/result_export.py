@@ -0,0 +1,285 @@
+import csv
+import json
+import os
+import sqlite3
+import struct
+from array import array
+from time import perf_counter
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from connection_profiles import PROFILES, connect
+from workspace import sync_attachments
+
+EXPORT_BATCH = 10000
+
+# Колоночный файл: MAGIC, длина и JSON со списком колонок, затем порции
+# строк. Порция - число строк и по каждой колонке: тип, код array для чисел,
+# флаг NULL, байт на строку с признаком значения (если NULL есть), длина
+# данных и данные. Типы: i - целые, d - float64, t - текст UTF-8, b - BLOB,
+# m - значения разных типов. Целые хранятся в самом узком типе, в который
+# влезают значения порции; у t и b код array относится к длинам значений, за
+# которыми идут сами значения. У m сначала по байту типа (i, d, t, b) на
+# значение, затем значения как у t: целое - int64, число - float64.
+MAGIC = b'LAB3COL1'
+COLUMNAR_EXTENSION = '.lcol'
+
+SIGNED_CODES = 'bhiq'
+UNSIGNED_CODES = 'BHIQ'
+# Целые, которые float64 хранит без потерь
+FLOAT_EXACT = 1 << 53
+
+
+def narrowest(values, codes):
+    """Самый узкий код array, в который помещаются все значения"""
+    low, high = (min(values), max(values)) if values else (0, 0)
+    for code in codes:
+        bits = array(code).itemsize * 8
+        if code.islower():
+            if -(1 << bits - 1) <= low and high < 1 << bits - 1:
+                return code
+        elif high < 1 << bits:
+            return code
+    return codes[-1]
+
+
+def pack_varlen(values):
+    lengths = [len(value) for value in values]
+    code = narrowest(lengths, UNSIGNED_CODES)
+    return code, array(code, lengths).tobytes() + b''.join(values)
+
+
+def unpack_varlen(code, data, count):
+    lengths = array(code)
+    size = lengths.itemsize * count
+    lengths.frombytes(data[:size])
+    values = []
+    start = size
+    for length in lengths:
+        values.append(data[start:start + length])
+        start += length
+    return values
+
+
+MIXED_PACKERS = {
+    int: (b'i', lambda value: struct.pack('<q', value)),
+    float: (b'd', lambda value: struct.pack('<d', value)),
+    str: (b't', lambda value: value.encode('utf-8')),
+    bytes: (b'b', bytes),
+}
+MIXED_UNPACKERS = {
+    ord('i'): lambda data: struct.unpack('<q', data)[0],
+    ord('d'): lambda data: struct.unpack('<d', data)[0],
+    ord('t'): lambda data: data.decode('utf-8'),
+    ord('b'): bytes,
+}
+
+
+def pack_mixed(values):
+    """Байты типов и значения колонки с разными типами"""
+    tags, payloads = [], []
+    for value in values:
+        packer = MIXED_PACKERS.get(type(value))
+        if packer is None:
+            raise TypeError(f"значение типа {type(value).__name__} нельзя записать в колоночный файл")
+        tag, pack = packer
+        tags.append(tag)
+        payloads.append(pack(value))
+    return b''.join(tags), payloads
+
+
+class CsvWriter:
+    def __init__(self, file, columns):
+        self.writer = csv.writer(file)
+        self.writer.writerow(columns)
+
+    def write_batch(self, rows):
+        self.writer.writerows(rows)
+
+
+class ColumnarWriter:
+    """Запись результата по колонкам: у каждой колонки порции один тип"""
+
+    def __init__(self, file, columns):
+        self.file = file
+        header = json.dumps(columns, ensure_ascii=False).encode('utf-8')
+        file.write(MAGIC + struct.pack('<I', len(header)) + header)
+
+    def write_batch(self, rows):
+        self.file.write(struct.pack('<I', len(rows)))
+        for values in zip(*rows):
+            self.write_column(values)
+
+    def write_column(self, values):
+        present = [value for value in values if value is not None]
+        kinds = {type(value) for value in present}
+        if kinds <= {int}:
+            kind, code = 'i', narrowest(present, SIGNED_CODES)
+            data = array(code, present).tobytes()
+        elif kinds <= {int, float} and all(
+            -FLOAT_EXACT <= value <= FLOAT_EXACT for value in present if type(value) is int
+        ):
+            kind, code = 'd', 'd'
+            data = array(code, present).tobytes()
+        elif kinds <= {bytes}:
+            kind = 'b'
+            code, data = pack_varlen(present)
+        elif kinds <= {str}:
+            kind = 't'
+            code, data = pack_varlen([value.encode('utf-8') for value in present])
+        else:
+            # Разные типы в одной колонке: тип хранится у каждого значения
+            kind = 'm'
+            tags, payloads = pack_mixed(present)
+            code, data = pack_varlen(payloads)
+            data = tags + data
+
+        has_nulls = len(present) != len(values)
+        self.file.write((kind + code).encode('ascii') + bytes([has_nulls]))
+        if has_nulls:
+            self.file.write(bytes(value is not None for value in values))
+        self.file.write(struct.pack('<Q', len(data)))
+        self.file.write(data)
+
+
+def read_columnar(path):
+    """Прочитать колоночный файл: (колонки, генератор порций строк)"""
+    file = open(path, 'rb')
+    if file.read(len(MAGIC)) != MAGIC:
+        file.close()
+        raise ValueError(f"{path}: не колоночный файл LAB3")
+    header_size, = struct.unpack('<I', file.read(4))
+    columns = json.loads(file.read(header_size).decode('utf-8'))
+
+    def batches():
+        with file:
+            while True:
+                size = file.read(4)
+                if not size:
+                    return
+                count, = struct.unpack('<I', size)
+                data_columns = [read_column(file, count) for _ in columns]
+                yield [list(row) for row in zip(*data_columns)]
+
+    return columns, batches()
+
+
+def read_column(file, count):
+    kind, code, has_nulls = file.read(3)
+    kind, code = chr(kind), chr(code)
+    mask = file.read(count) if has_nulls else None
+    length, = struct.unpack('<Q', file.read(8))
+    data = file.read(length)
+    present = count - mask.count(0) if has_nulls else count
+    if kind in 'id':
+        values = array(code)
+        values.frombytes(data)
+        values = values.tolist()
+    elif kind == 'm':
+        tags = data[:present]
+        values = unpack_varlen(code, data[present:], present)
+        values = [MIXED_UNPACKERS[tag](value) for tag, value in zip(tags, values)]
+    else:
+        values = unpack_varlen(code, data, present)
+        if kind == 't':
+            values = [value.decode('utf-8') for value in values]
+    if not has_nulls:
+        return values
+    values = iter(values)
+    return [next(values) if flag else None for flag in mask]
+
+
+WRITERS = {
+    'csv': (CsvWriter, {'mode': 'w', 'newline': '', 'encoding': 'utf-8'}),
+    'columnar': (ColumnarWriter, {'mode': 'wb'}),
+}
+
+
+class ExportWorker(QObject):
+    """Выгрузка результата запроса в файл порциями прямо с курсора.
+
+    В памяти одновременно только одна порция строк, поэтому размер
+    выгружаемого результата ничем не ограничен. Соединение своё и только
+    для чтения: повторное выполнение запроса ничего в базе не изменит.
+    Остальные базы пространства подключаются к нему так же, как к
+    соединениям вкладок, чтобы выгружался и запрос к нескольким базам.
+    """
+
+    # строк записано
+    progress = pyqtSignal(int)
+    # файл, строк, секунд
+    finished = pyqtSignal(str, int, float)
+    failed = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.cancelled = False
+        self.connection = None
+
+    @pyqtSlot(str, str, str, str, object)
+    def export(self, db_path, query, path, file_format, attachments):
+        self.cancelled = False
+        writer_class, open_args = WRITERS[file_format]
+        started = perf_counter()
+        rows_written = 0
+        try:
+            self.connection = connect(db_path, PROFILES['readonly'])
+            sync_attachments(self.connection, attachments)
+            cursor = self.connection.execute(query)
+            if not cursor.description:
+                raise sqlite3.Error("запрос не возвращает строк")
+            columns = [description[0] for description in cursor.description]
+            with open(path, **open_args) as file:
+                writer = writer_class(file, columns)
+                while not self.cancelled:
+                    rows = cursor.fetchmany(EXPORT_BATCH)
+                    if not rows:
+                        break
+                    writer.write_batch(rows)
+                    rows_written += len(rows)
+                    self.progress.emit(rows_written)
+            if self.cancelled:
+                raise sqlite3.OperationalError("interrupted")
+        except Exception as e:
+            # Недописанный файл не оставляем, что бы ни прервало запись
+            # (ошибка базы, диска, преобразования значения или кодировки)
+            if os.path.exists(path):
+                os.remove(path)
+            self.failed.emit(str(e) or type(e).__name__)
+            return
+        finally:
+            connection, self.connection = self.connection, None
+            if connection is not None:
+                connection.close()
+        self.finished.emit(path, rows_written, perf_counter() - started)
+
+
+class ExportRunner(QObject):
+    """Поток с ExportWorker; выгрузка не мешает запросам во вкладках"""
+
+    export_requested = pyqtSignal(str, str, str, str, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread = QThread(self)
+        self.worker = ExportWorker()
+        self.worker.moveToThread(self.thread)
+        self.export_requested.connect(self.worker.export)
+        self.thread.finished.connect(self.worker.deleteLater)
+        self.thread.start()
+
+    def export(self, db_path, query, path, file_format, attachments=None):
+        self.export_requested.emit(db_path, query, path, file_format, attachments or {})
+
+    def cancel(self):
+        self.worker.cancelled = True
+        connection = self.worker.connection
+        if connection is not None:
+            try:
+                # Прерывает запрос, который ещё не отдал первую строку
+                connection.interrupt()
+            except sqlite3.ProgrammingError:
+                pass
+
+    def shutdown(self):
+        self.cancel()
+        self.thread.quit()
+        self.thread.wait()
@@ -0,0 +1,222 @@
+from collections import OrderedDict
+from time import perf_counter
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QVariant, pyqtSignal
+
+
+class QueryResultModel(QAbstractTableModel):
+    """Результат SQL запроса, который читается с курсора порциями.
+
+    Сам запрос выполняется в потоке QueryRunner, модель только получает от
+    него страницы по page_size строк. Представление просит следующую
+    страницу через canFetchMore/fetchMore, когда пользователь докручивает до
+    конца загруженных строк. В памяти остаётся не больше max_pages страниц;
+    вытесненная страница перечитывается в фоне запросом с LIMIT/OFFSET, а
+    пока её нет, ячейки показывают «…». Если запрос нельзя обернуть в
+    подзапрос (например, PRAGMA), страницы не вытесняются.
+
+    Готовый результат из кэша передаётся в cached как (колонки, строки):
+    тогда запрос не выполняется вовсе.
+
+    Если запрос отсортирован базой, order - (номер колонки, по убыванию).
+    Тогда для каждой страницы запоминается значение этой колонки в её
+    первой строке, и вытесненная страница ищется по нему, а не по OFFSET.
+    """
+
+    # строк загружено, результат дочитан до конца
+    progress = pyqtSignal(int, bool)
+    failed = pyqtSignal(str)
+
+    def __init__(self, runner, db_path, query, page_size=1000, max_pages=50, cached=None,
+                 order=None, parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        self.db_path = db_path
+        self.query = query
+        self.order = order
+        # Номер страницы -> (значение в первой строке, сколько строк с тем же
+        # значением стоит перед ней)
+        self.seeks = {}
+        self.last_key = None
+        self.last_run = 0
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.pages = OrderedDict()
+        self.requested_pages = set()
+        self.columns = []
+        self.row_count = 0
+        self.page_loads = 0
+        self.can_reload = False
+        self.exhausted = False
+        # Порция строк запрошена, но ещё не пришла; с какого момента и
+        # сколько длилось ожидание предыдущей порции
+        self.pending = True
+        self.pending_since = perf_counter()
+        self.last_duration = 0.0
+        self.from_cache = cached is not None
+        # Время до первой порции уже записано в журнал запросов
+        self.logged = False
+
+        if self.from_cache:
+            self.request_id = None
+            self.columns, rows = cached
+            for first in range(0, len(rows), page_size):
+                self.pages[first // page_size] = rows[first:first + page_size]
+            self.row_count = len(rows)
+            self.pending = False
+            self.exhausted = True
+            return
+
+        worker = runner.worker
+        worker.started.connect(self.on_started)
+        worker.rows_ready.connect(self.on_rows_ready)
+        worker.page_ready.connect(self.on_page_ready)
+        worker.failed.connect(self.on_failed)
+        self.request_id = runner.execute(db_path, query, page_size)
+
+    def on_started(self, request_id, columns, can_reload):
+        if request_id != self.request_id:
+            return
+        self.beginResetModel()
+        self.columns = columns
+        self.can_reload = can_reload
+        self.endResetModel()
+
+    def on_rows_ready(self, request_id, rows, exhausted):
+        if request_id != self.request_id:
+            return
+        self.pending = False
+        self.last_duration = perf_counter() - self.pending_since
+        self.exhausted = exhausted
+        if rows:
+            first = self.row_count
+            if self.order is not None:
+                self.remember_seek(first // self.page_size, rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self.store_page(first // self.page_size, rows)
+            self.row_count += len(rows)
+            self.endInsertRows()
+        self.progress.emit(self.row_count, exhausted)
+
+    def on_page_ready(self, request_id, page, rows):
+        if request_id != self.request_id:
+            return
+        self.requested_pages.discard(page)
+        self.store_page(page, rows)
+        first = page * self.page_size
+        last = min(self.row_count, first + len(rows)) - 1
+        if last >= first:
+            self.dataChanged.emit(
+                self.index(first, 0), self.index(last, len(self.columns) - 1)
+            )
+
+    def on_failed(self, request_id, message):
+        if request_id != self.request_id:
+            return
+        self.pending = False
+        self.last_duration = perf_counter() - self.pending_since
+        self.exhausted = True
+        self.failed.emit(message)
+
+    def remember_seek(self, page, rows):
+        """Запомнить, с какого значения сортируемой колонки начинается страница"""
+        column = self.order[0]
+        key = rows[0][column]
+        last = rows[-1][column]
+        continues = self.row_count > 0 and key == self.last_key
+        # NULL не найти сравнением, страницу с ними перечитает OFFSET
+        # (при сортировке по убыванию NULL идут в самом конце)
+        seek_key = None if last is None else key
+        self.seeks[page] = (seek_key, self.last_run if continues else 0)
+
+        # Сколько строк с последним значением в конце прочитанного
+        run = 0
+        for row in reversed(rows):
+            if row[column] != last:
+                break
+            run += 1
+        if run == len(rows) and continues:
+            run += self.last_run
+        self.last_key, self.last_run = last, run
+
+    def store_page(self, page, rows):
+        self.pages[page] = rows
+        self.pages.move_to_end(page)
+        if self.can_reload:
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and not self.pending
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self.pending = True
+        self.pending_since = perf_counter()
+        self.runner.fetch_requested.emit(self.request_id, self.page_size)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return QVariant()
+        page, offset = divmod(index.row(), self.page_size)
+        rows = self.pages.get(page)
+        if rows is None:
+            if page not in self.requested_pages:
+                self.requested_pages.add(page)
+                self.page_loads += 1
+                self.runner.reload_requested.emit(
+                    self.request_id, page, self.page_size, self.page_seek(page)
+                )
+            return "…"
+        self.pages.move_to_end(page)
+        if offset >= len(rows):
+            return QVariant()
+        value = rows[offset][index.column()]
+        return str(value) if value is not None else ""
+
+    def page_seek(self, page):
+        key, skip = self.seeks.get(page, (None, 0))
+        if key is None:
+            return None
+        column, descending = self.order
+        return self.columns[column], descending, key, skip
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self.columns[section] if section < len(self.columns) else QVariant()
+        return str(section + 1)
+
+    def elapsed(self):
+        """Сколько идёт (или шло) ожидание последней порции строк, в секундах"""
+        return perf_counter() - self.pending_since if self.pending else self.last_duration
+
+    def all_rows(self):
+        """Все строки результата, если он дочитан и ни одна страница не вытеснена"""
+        page_count = -(-self.row_count // self.page_size)
+        if not self.exhausted or len(self.pages) != page_count:
+            return None
+        rows = []
+        for page in range(page_count):
+            rows.extend(self.pages[page])
+        return rows
+
+    def close(self):
+        """Закрыть курсор, не дочитывая результат"""
+        self.exhausted = True
+        self.pages.clear()
+        if self.from_cache:
+            return
+        worker = self.runner.worker
+        worker.started.disconnect(self.on_started)
+        worker.rows_ready.disconnect(self.on_rows_ready)
+        worker.page_ready.disconnect(self.on_page_ready)
+        worker.failed.disconnect(self.on_failed)
+        self.runner.forget_requested.emit(self.request_id)
@@ -0,0 +1,94 @@
+import sqlite3
+from collections import namedtuple
+
+Column = namedtuple('Column', 'name type pk')
+Index = namedtuple('Index', 'name columns unique')
+
+# Колонки всех таблиц одним запросом вместо PRAGMA table_info на каждую
+COLUMNS_QUERY = """
+    SELECT m.name, p.name, p.type, p.pk
+    FROM sqlite_master AS m, pragma_table_info(m.name) AS p
+    WHERE m.type = 'table'
+    ORDER BY m.rowid, p.cid
+"""
+
+INDEXES_QUERY = """
+    SELECT m.name, il.name, il."unique", ii.name
+    FROM sqlite_master AS m, pragma_index_list(m.name) AS il,
+         pragma_index_info(il.name) AS ii
+    WHERE m.type = 'table'
+    ORDER BY m.rowid, il.seq, ii.seqno
+"""
+
+# Оценка числа строк из статистики ANALYZE: первое число в stat
+ROW_COUNTS_QUERY = "SELECT tbl, max(CAST(stat AS INTEGER)) FROM sqlite_stat1 GROUP BY tbl"
+
+
+class SchemaIndex:
+    """Схема базы в памяти: таблицы, колонки с типами, индексы и оценки
+    числа строк.
+
+    Загружается за один проход по sqlite_master и перечитывается только
+    тогда, когда меняется PRAGMA schema_version.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.schema_version = None
+        self.tables = {}
+        self.indexes = {}
+        self.row_counts = {}
+
+    def refresh(self, connection):
+        """Перечитать схему, если она изменилась; True - если перечитали"""
+        version = connection.execute("PRAGMA schema_version").fetchone()[0]
+        if version == self.schema_version:
+            return False
+        self.load(connection)
+        self.schema_version = version
+        return True
+
+    def load(self, connection):
+        tables = {}
+        for table, name, column_type, pk in connection.execute(COLUMNS_QUERY):
+            tables.setdefault(table, []).append(Column(name, column_type, bool(pk)))
+
+        indexes = {}
+        for table, name, unique, column in connection.execute(INDEXES_QUERY):
+            table_indexes = indexes.setdefault(table, [])
+            if not table_indexes or table_indexes[-1].name != name:
+                table_indexes.append(Index(name, [], bool(unique)))
+            table_indexes[-1].columns.append(column)
+
+        row_counts = {}
+        try:
+            row_counts = dict(connection.execute(ROW_COUNTS_QUERY))
+        except sqlite3.OperationalError:
+            # ANALYZE не запускали: оценок нет
+            pass
+
+        self.tables = tables
+        self.indexes = indexes
+        self.row_counts = row_counts
+
+    def table_names(self):
+        return list(self.tables)
+
+    def qualified_columns(self):
+        """Все колонки в виде «таблица.колонка»"""
+        return [
+            f"{table}.{column.name}"
+            for table, columns in self.tables.items()
+            for column in columns
+        ]
+
+    def indexed_columns(self, table):
+        """Колонки, с которых начинается хотя бы один индекс таблицы,
+        включая INTEGER PRIMARY KEY (он же rowid)"""
+        columns = {index.columns[0] for index in self.indexes.get(table, []) if index.columns}
+        keys = [column for column in self.tables.get(table, []) if column.pk]
+        if len(keys) == 1 and keys[0].type.upper() == 'INTEGER':
+            columns.add(keys[0].name)
+        return columns
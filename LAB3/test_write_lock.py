@@ -0,0 +1,99 @@
+"""Запись в базу при недочитанных результатах вкладок.
+
+    cd LAB3 && python -m unittest test_write_lock
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from time import perf_counter
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+import main
+from query_worker import writes_database
+
+ROWS = 20000
+
+
+class WritesDatabaseTest(unittest.TestCase):
+    def test_reads(self):
+        for query in ["SELECT * FROM t", "  with x as (select 1) select * from x",
+                      "VALUES (1)", "EXPLAIN QUERY PLAN SELECT 1", "PRAGMA table_info(t)"]:
+            self.assertFalse(writes_database(query), query)
+
+    def test_writes(self):
+        for query in ["UPDATE t SET v = 1", "insert into t values (1)", "DELETE FROM t",
+                      "CREATE INDEX i ON t(v)", "WITH x AS (SELECT 1) DELETE FROM t",
+                      "PRAGMA user_version = 3"]:
+            self.assertTrue(writes_database(query), query)
+
+
+class WriteWithOpenCursorsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directory.name, 'lock.db')
+        with sqlite3.connect(self.db_path) as connection:
+            # Обычный журнал: читатель мешает записи, в отличие от WAL
+            connection.execute("CREATE TABLE t(id INTEGER PRIMARY KEY, v INTEGER)")
+            connection.executemany("INSERT INTO t(v) VALUES (?)", ((i,) for i in range(ROWS)))
+        connection.close()
+
+        self.errors = []
+        self.patches = {
+            name: getattr(QMessageBox, name) for name in ('information', 'warning', 'critical')
+        }
+        QMessageBox.information = staticmethod(lambda *args, **kwargs: None)
+        QMessageBox.warning = staticmethod(lambda *args, **kwargs: self.errors.append(args[2]))
+        QMessageBox.critical = staticmethod(lambda *args, **kwargs: self.errors.append(args[2]))
+
+        self.window = main.MainWindow()
+        self.window.open_database(self.db_path)
+
+    def tearDown(self):
+        self.window.close()
+        for name, function in self.patches.items():
+            setattr(QMessageBox, name, function)
+        self.directory.cleanup()
+
+    def wait(self, condition, timeout=10):
+        deadline = perf_counter() + timeout
+        while not condition():
+            self.assertLess(perf_counter(), deadline, "запрос не завершился")
+            QTest.qWait(10)
+
+    def test_update_with_half_fetched_tab(self):
+        window = self.window
+        window.execute_query("SELECT * FROM t", 3)
+        self.wait(lambda: window.models[3] is not None and not window.models[3].pending)
+        # Прочитана только первая страница: курсор вкладки остаётся открытым
+        self.assertFalse(window.models[3].exhausted)
+
+        started = perf_counter()
+        window.execute_query("UPDATE t SET v = v + 1", 1)
+        self.wait(lambda: window.models[1].exhausted)
+        # Без закрытия курсора запись ждала бы busy timeout (5 с) до ошибки
+        self.assertLess(perf_counter() - started, 4)
+        self.assertEqual(self.errors, [])
+
+        with sqlite3.connect(self.db_path) as connection:
+            changed = connection.execute("SELECT count(*) FROM t WHERE v = id").fetchone()[0]
+        connection.close()
+        self.assertEqual(changed, ROWS)
+
+        # Закрытый на время записи результат перезапущен и видит новые данные
+        self.wait(lambda: window.models[3] is not None and not window.models[3].pending)
+        model = window.models[3]
+        self.assertEqual(model.query, "SELECT * FROM t")
+        self.assertEqual(model.data(model.index(0, 1)), "1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from connection_profiles import PROFILES, connect
+from result_cache import QueryResultCache
+from schema_index import SchemaIndex
+
+# Сколько свободных соединений пул держит открытыми для одного файла
+POOL_SIZE = 4
+TAB_COUNT = 5
+# Сколько баз SQLite разрешает подключить к одному соединению (SQLITE_MAX_ATTACHED);
+# к каждой базе подключены все остальные, поэтому открыто не больше MAX_ATTACHED + 1
+MAX_ATTACHED = 10
+
+
+def database_alias(path, taken):
+    """Имя базы для ATTACH: имя файла без расширения, уникальное в пространстве"""
+    alias = re.sub(r'\W', '_', Path(path).stem) or 'db'
+    if alias[0].isdigit() or alias.lower() in ('main', 'temp'):
+        alias = 'db_' + alias
+    candidate, number = alias, 2
+    while candidate.lower() in {name.lower() for name in taken}:
+        candidate, number = f"{alias}_{number}", number + 1
+    return candidate
+
+
+def sync_attachments(connection, attachments):
+    """Подключить к соединению базы attachments {имя: путь} и отключить лишние.
+
+    Остальные базы подключаются только для чтения: запросы между базами
+    читают их, но не берут блокировку записи на чужие файлы.
+    """
+    attached = {name: path for _, name, path in connection.execute("PRAGMA database_list")}
+    for name, path in list(attached.items()):
+        if name in ('main', 'temp'):
+            continue
+        wanted = attachments.get(name)
+        if wanted is None or os.path.realpath(wanted) != os.path.realpath(path):
+            # Имя освободилось или теперь принадлежит другому файлу
+            connection.execute(f'DETACH DATABASE "{name}"')
+            del attached[name]
+    for name, path in attachments.items():
+        if name not in attached:
+            uri = Path(path).resolve().as_uri() + "?mode=ro"
+            connection.execute(f'ATTACH DATABASE ? AS "{name}"', (uri,))
+
+
+class ConnectionPool:
+    """Пул соединений потока запросов к одному файлу.
+
+    Открытое соединение помнит разобранную схему, поэтому запрос на
+    соединении из пула не перечитывает sqlite_master. Соединения с открытым
+    результатом заняты, пока модель его не закроет; свободных остаётся не
+    больше size.
+    """
+
+    def __init__(self, db_path, profile, size=POOL_SIZE):
+        self.db_path = db_path
+        self.profile = profile
+        self.size = size
+        self.idle = []
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return connect(self.db_path, self.profile, check_same_thread=False)
+
+    def release(self, connection):
+        if connection.in_transaction:
+            connection.rollback()
+        with self.lock:
+            if not self.closed and len(self.idle) < self.size:
+                self.idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.close()
+
+
+class Database:
+    """Открытая база пространства: соединение окна, схема, кэш результатов
+    и состояние вкладок, чтобы переключение на неё ничего не перечитывало"""
+
+    def __init__(self, path, alias, profile_name):
+        self.path = path
+        self.alias = alias
+        self.profile_name = profile_name
+        self.connection = connect(path, PROFILES[profile_name])
+        self.cursor = self.connection.cursor()
+        self.schema = SchemaIndex()
+        self.result_cache = QueryResultCache()
+        self.models = [None] * TAB_COUNT
+        self.base_queries = [None] * TAB_COUNT
+        self.filters = [""] * TAB_COUNT
+        self.sort_orders = [None] * TAB_COUNT
+
+    def close(self):
+        self.connection.close()
+
+
+class Workspace:
+    """Несколько открытых баз; каждая доступна остальным через ATTACH"""
+
+    def __init__(self):
+        self.databases = OrderedDict()
+
+    def get(self, path):
+        return self.databases.get(os.path.abspath(path))
+
+    def open(self, path, profile_name):
+        """Открыть базу и подключить её к остальным.
+
+        База попадает в пространство только после того, как ATTACH прошёл
+        на всех соединениях; при ошибке остальные базы остаются как были.
+        """
+        path = os.path.abspath(path)
+        if len(self.databases) > MAX_ATTACHED:
+            raise sqlite3.OperationalError(
+                f"открыто уже {len(self.databases)} баз - больше к одному соединению "
+                f"не подключить; закройте одну из них"
+            )
+        alias = database_alias(path, [database.alias for database in self.databases.values()])
+        database = Database(path, alias, profile_name)
+        self.databases[path] = database
+        try:
+            self.sync_attachments()
+        except sqlite3.Error:
+            del self.databases[path]
+            database.close()
+            self.sync_attachments()
+            raise
+        return database
+
+    def close(self, path):
+        database = self.databases.pop(os.path.abspath(path))
+        database.close()
+        self.sync_attachments()
+
+    def aliases(self):
+        return {path: database.alias for path, database in self.databases.items()}
+
+    def attachments(self, path):
+        return other_databases(self.aliases(), path)
+
+    def sync_attachments(self):
+        for path, database in self.databases.items():
+            sync_attachments(database.connection, self.attachments(path))
+
+
+def other_databases(aliases, path):
+    """Базы для ATTACH к соединению с path: {имя: путь} всех остальных"""
+    return {alias: other for other, alias in aliases.items() if other != path}